@@ -2,16 +2,27 @@
 from flask import Flask, request, jsonify
 import os
 import json
+import hmac
 import urllib.request
 import re
-from engine import process_command, BOT_USERNAME
+from engine import process_command, flush_pending_writes, warm_connection, refresh_schema, BOT_USERNAME
 
 app = Flask(__name__)
 
+# Sheets setup runs while Flask handles the first webhook; commands that need it wait for it
+warm_connection()
+
+# Built once: every incoming message is cleaned with these
+MENTION_RE = re.compile(re.escape(f"@{BOT_USERNAME}"), re.IGNORECASE) if BOT_USERNAME else None
+EDGE_PUNCT_RE = re.compile(r'^[:\s,]+|[:\s,]+$')
+
 TELEGRAM_TOKEN = os.environ.get('TELEGRAM_TOKEN')
 if not TELEGRAM_TOKEN:
     raise RuntimeError("TELEGRAM_TOKEN is not set.")
 
+# Shared secret for the admin routes; they stay disabled while it is unset
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
 def send_telegram_message(chat_id, text):
     """Sends a message back to Telegram."""
     url = f'https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage'
@@ -68,10 +79,9 @@ def clean_message_text(text):
     
     if mention_lower in text_lower:
         # Find and remove the mention
-        pattern = re.compile(re.escape(mention), re.IGNORECASE)
-        cleaned = pattern.sub('', text)
+        cleaned = MENTION_RE.sub('', text)
         # Clean up extra spaces or punctuation
-        cleaned = re.sub(r'^[:\s,]+|[:\s,]+$', '', cleaned)
+        cleaned = EDGE_PUNCT_RE.sub('', cleaned)
         return cleaned.strip()
     
     return text.strip()
@@ -111,6 +121,10 @@ def webhook():
             elif chat_type == 'private':
                 # In private chats, always respond
                 send_telegram_message(chat_id, "🤔 I'm here to help! Try `tutorial` to get started.")
+            
+            # The reply is out; now write anything the engine queued before the function exits
+            if not flush_pending_writes():
+                send_telegram_message(chat_id, "⚠️ Your last record may not have been saved to the sheet. Check `today` before recording it again.")
 
     # 2. IGNORE OTHER UPDATES
     elif 'my_chat_member' in update or 'chat_member' in update:
@@ -148,10 +162,19 @@ def index():
     </html>
     """
 
+@app.route('/api/refresh-schema', methods=['POST'])
+def refresh_schema_route():
+    """Admin only: re-check sheet headers after the spreadsheet was edited by hand."""
+    token = request.headers.get('X-Admin-Token', '')
+    if not ADMIN_TOKEN or not hmac.compare_digest(token, ADMIN_TOKEN):
+        return jsonify({'status': 'forbidden'}), 403
+    return jsonify({'status': 'ok', 'result': refresh_schema()})
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint (minimal information)."""
     from engine import get_status
+    flush_pending_writes()
     status = get_status()
     return jsonify({
         'status': 'healthy' if status['status'] == 'connected' else 'unhealthy',
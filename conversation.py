@@ -5,6 +5,18 @@ from datetime import datetime
 import time
 from gemini import process_with_gemini
 
+# Fallback transaction phrasings, tried in order (compiled once, used per message)
+TRANSACTION_PATTERNS = [
+    # "spent 100 on lunch"
+    (re.compile(r'(?:spent|paid|bought|purchased)\s+(\d+(?:\.\d{1,2})?)\s+(?:on|for)\s+(.+)'), 'expense'),
+    # "made 500 from client"
+    (re.compile(r'(?:made|earned|received|got)\s+(\d+(?:\.\d{1,2})?)\s+(?:from|for)\s+(.+)'), 'sale'),
+    # "100 for lunch"
+    (re.compile(r'(\d+(?:\.\d{1,2})?)\s+(?:for|on)\s+(.+)'), 'unknown'),
+    # "lunch 100"
+    (re.compile(r'(.+?)\s+(\d+(?:\.\d{1,2})?)$'), 'unknown'),
+]
+
 class ConversationalAgent:
     """Makes the bot conversational and intelligent with optional AI"""
     
@@ -157,21 +169,10 @@ class ConversationalAgent:
     
     def extract_transaction_details(self, message: str):
         """Extract transaction details from natural language (Fallback Logic)."""
-        patterns = [
-            # "spent 100 on lunch"
-            (r'(?:spent|paid|bought|purchased)\s+(\d+(?:\.\d{1,2})?)\s+(?:on|for)\s+(.+)', 'expense'),
-            # "made 500 from client"
-            (r'(?:made|earned|received|got)\s+(\d+(?:\.\d{1,2})?)\s+(?:from|for)\s+(.+)', 'sale'),
-            # "100 for lunch"
-            (r'(\d+(?:\.\d{1,2})?)\s+(?:for|on)\s+(.+)', 'unknown'),
-            # "lunch 100"
-            (r'(.+?)\s+(\d+(?:\.\d{1,2})?)$', 'unknown'),
-        ]
-        
         message_lower = message.lower()
         
-        for pattern, trans_type in patterns:
-            match = re.search(pattern, message_lower)
+        for pattern, trans_type in TRANSACTION_PATTERNS:
+            match = pattern.search(message_lower)
             if match:
                 if trans_type == 'unknown':
                     # Need to determine type from context
@@ -350,6 +351,11 @@ class SmartProcessor:
                 r'what.*options'
             ]
         }
+        # Compiled once; fallback_parse_to_command runs them against every message
+        self.command_patterns = {
+            command: [re.compile(pattern) for pattern in patterns]
+            for command, patterns in self.command_patterns.items()
+        }
         
     def process_message(self, message: str, user_name: str, saved_memory: str = "") -> dict:
         """
@@ -374,7 +380,7 @@ class SmartProcessor:
         # Check for command patterns
         for command, patterns in self.command_patterns.items():
             for pattern in patterns:
-                if re.search(pattern, message_lower):
+                if pattern.search(message_lower):
                     return command
         
         return None
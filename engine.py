@@ -6,10 +6,18 @@ import re
 import secrets
 import time
 import io
+import functools
+import heapq
+import operator
+import atexit
+import threading
+import itertools
+from bisect import bisect_left, bisect_right
 import requests
+from urllib3.exceptions import NewConnectionError
 from google.oauth2.service_account import Credentials
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from xml.sax.saxutils import escape as xml_escape
 
 from conversation import conversation_agent, nlp_processor
@@ -30,7 +38,58 @@ TYPE_TO_SHEET = {
     'income': 'Income'
 }
 
+# Alias sets for membership checks on hot paths
+INCOME_TYPES = frozenset({'sale', 'income'})
+PERIOD_NAMES = frozenset({'daily', 'weekly', 'monthly'})
+REPORT_PERIODS = frozenset({'today', 'week', 'month'})
+CLOSED_ORDER_STATUSES = frozenset({'delivered', 'cancelled'})
+OPEN_ORDER_STATUSES = frozenset({'pending', 'in progress', 'ready for delivery'})
+RECORD_INTENTS = frozenset({'record_expense', 'record_sale', 'record_income'})
+CHAT_INTENTS = frozenset({'greeting', 'compliment', 'thanks', 'general_chat'})
+
+# Messages starting with these are commands, never a quick-record item name.
+# The snake_case ones can't be item names; other plain words are left off so
+# trained items like "listerine" still get their price suggestion.
+COMMAND_PREFIXES = ('+', '/', 'balance', 'today', 'week', 'month', 'help', 'tutorial',
+                    'price_', 'show_', 'list_', 'my_', 'trained_', 'budget_', 'best_price', 'set_budget')
+
+# Sign of each transaction type in the balance
+TYPE_SIGN = {'sale': 1.0, 'income': 1.0, 'expense': -1.0}
+
+# Transaction ID prefix (SAL-XXXXXX) -> sheet
+ID_PREFIX_TO_SHEET = {
+    'SAL': 'Sales',
+    'EXP': 'Expenses',
+    'INC': 'Income'
+}
+
 BOT_USERNAME = os.environ.get('BOT_USERNAME', '').lstrip('@')
+# Lowercased "@botname" stripped from the start of messages
+MENTION_PREFIX = f"@{BOT_USERNAME}".lower() if BOT_USERNAME else ""
+
+# Precompiled patterns used on every transaction
+HASHTAG_RE = re.compile(r'#(\w+)')
+HASHTAG_STRIP_RE = re.compile(r'#\w+')
+WHITESPACE_RE = re.compile(r'\s+')
+NON_DIGIT_RE = re.compile(r'\D')
+ORDER_DETAILS_SPLIT_RE = re.compile(r'[,|]')
+UPDATED_ROW_RE = re.compile(r'![A-Z]+(\d+)')
+EDGE_PUNCT_RE = re.compile(r'^[:\s]+|[:\s]+$')
+NUMBER_WORD_RE = re.compile(r'\b\d+(\.\d+)?\b')
+NUMBER_TOKEN_RE = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)')
+HAS_LETTER_RE = re.compile(r'[^\W\d_]')
+CORRECTION_REPLY_RE = re.compile(r'[, ]*\d[\d, ]*')
+
+# Words dropped from sale descriptions when grouping them by service
+SERVICE_FILLER_WORDS = frozenset(['for', 'with', 'of', 'and', 'the', 'a', 'an'])
+
+# Quantity/unit patterns, tried in order: "10 chairs", "3 reams of paper", "for 10 people", "2.5kg sugar"
+QUANTITY_PATTERNS = [
+    re.compile(r'(\d+)\s*(?:x\s*)?([a-zA-Z]+)\b', re.IGNORECASE),
+    re.compile(r'(\d+)\s*([a-zA-Z]{1,3})\s+of\s+', re.IGNORECASE),
+    re.compile(r'for\s+(\d+)\s+([a-zA-Z]+)', re.IGNORECASE),
+    re.compile(r'(\d+(?:\.\d+)?)\s*([a-zA-Z]{2,})\b', re.IGNORECASE),
+]
 
 # ==================== BUSINESS PROFILE ====================
 BUSINESS_PROFILE = {
@@ -42,8 +101,15 @@ BUSINESS_PROFILE = {
     "footer": "Thank you for choosing Radikal Creative Technologies! 🚀"
 }
 
-# Global spreadsheet connection
+# Global spreadsheet connection, opened on first use (see get_spreadsheet)
 spreadsheet = None
+_connection_attempted = False
+# Reentrant: setup itself calls get_spreadsheet; other threads wait here until it finishes
+CONNECTION_LOCK = threading.RLock()
+_connection_ready = threading.Event()
+
+# Worksheet handles by title, so each sheet is looked up only once per process
+WORKSHEET_CACHE = {}
 
 # Global state for interactive flows
 ORDER_STATES = {}
@@ -51,21 +117,664 @@ ORDER_STATES = {}
 # Simple in-memory cache to prevent hitting Google Sheets rate limits
 USER_CONTEXT_CACHE = {}
 
+# In-memory mirror of the PriceRanges sheet (reads are local, writes go through to Sheets)
+PRICE_RANGES_CACHE = {'rows': None, 'index': {}, 'typed': None, 'detect': None, 'timestamp': 0}
+PRICE_RANGES_TTL = 300
+PRICE_RANGES_WIDTH = 9
+
+# Budgets rows (header first); spending updates are mirrored in place, other writes drop it
+BUDGETS_CACHE = {'rows': None, 'index': None, 'by_user': None, 'timestamp': 0}
+BUDGETS_TTL = 15
+BUDGETS_WIDTH = 12
+
+# Raw rows (header first) of Orders, Goals, Recurring and PriceHistory, dropped on every write to them
+SHEET_ROWS_CACHE = {}
+SHEET_ROWS_TTL = 30
+# Sheets whose readers only use leading columns, read as this A1 column span instead of in full
+SHEET_ROWS_COLUMNS = {'PriceHistory': 'A:F'}
+
+# Sheets being read by prefetch_in_background right now, so a second request doesn't duplicate the read
+PREFETCHING = set()
+
+# Sheets whose headers were already checked this process (see refresh_schema)
+ENSURED_SHEETS = set()
+
+# Header rows read in one call ahead of the structure checks, each used once (see prefetch_headers)
+HEADER_ROWS = {}
+STRUCTURED_SHEETS = ('Sales', 'Expenses', 'Income', 'DeletedTransactions', 'PriceRanges', 'PriceHistory', 'Budgets', 'Orders')
+
+# Columns a ledger sheet needs before its rows can be read as transactions
+LEDGER_ESSENTIAL_COLUMNS = ('date', 'amount', 'description', 'user')
+
+# Parsed ledger rows per sheet (Sales/Expenses/Income), dropped on every write
+ROWS_CACHE = {}
+ROWS_CACHE_TTL = 30
+# After this long a stale sheet is re-read in full rather than just its new tail
+ROWS_FULL_REFRESH = 600
+LEDGER_SHEETS = ('Sales', 'Expenses', 'Income')
+
+# Report rows per Table flowable, so ReportLab lays out a long report a piece at a time
+REPORT_TABLE_CHUNK = 200
+
+# Logo bytes by URL (successful downloads only), and downloads still running (see prefetch_logo)
+LOGO_CACHE = {}
+LOGO_FETCHES = {}
+
+# ==================== WORKSHEET HANDLES ====================
+def get_worksheet(sheet_name):
+    """Get a worksheet by title, resolving it by name only on first use."""
+    worksheet = WORKSHEET_CACHE.get(sheet_name)
+    if worksheet is None:
+        # Raises WorksheetNotFound, so a missing sheet is never cached
+        worksheet = get_spreadsheet().worksheet(sheet_name)
+        WORKSHEET_CACHE[sheet_name] = worksheet
+    return worksheet
+
+def create_worksheet(title, rows=1000, cols=26):
+    """Create a worksheet and remember its handle."""
+    worksheet = get_spreadsheet().add_worksheet(title=title, rows=rows, cols=cols)
+    WORKSHEET_CACHE[title] = worksheet
+    return worksheet
+
+def load_worksheet_handles():
+    """Fetch every worksheet handle in one metadata call."""
+    WORKSHEET_CACHE.clear()
+    for worksheet in spreadsheet.worksheets():
+        WORKSHEET_CACHE[worksheet.title] = worksheet
+
+def prefetch_headers(sheet_names=STRUCTURED_SHEETS):
+    """Read row 1 of every existing sheet in `sheet_names` with one values_batch_get.
+    
+    If the call fails, nothing is stored and each check reads its own header.
+    """
+    names = [name for name in sheet_names if name in WORKSHEET_CACHE]
+    if len(names) < 2:
+        return
+    try:
+        value_ranges = spreadsheet.values_batch_get([f"'{name}'!1:1" for name in names]).get('valueRanges', [])
+    except Exception:
+        return
+    for name, value_range in zip(names, value_ranges):
+        HEADER_ROWS[name] = (value_range.get('values') or [[]])[0]
+
+def header_row(worksheet):
+    """Row 1 of a worksheet, from prefetch_headers when it has it, else read."""
+    headers = HEADER_ROWS.pop(worksheet.title, None)
+    return headers if headers is not None else worksheet.row_values(1)
+
+# ==================== LEDGER ROW CACHE ====================
+def column_letter(col):
+    """1-based column number -> A1 column letters (8 -> 'H')."""
+    letters = ""
+    while col > 0:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+def pad_rows(values):
+    """API value rows padded to the widest one, the shape get_all_values returns."""
+    width = max((len(row) for row in values), default=0)
+    return [row + [''] * (width - len(row)) for row in values]
+
+def pad_rows_to(rows, width):
+    """Rows extended with empty cells to at least `width`, so fixed columns need no length checks."""
+    return [row if len(row) >= width else row + [''] * (width - len(row)) for row in rows]
+
+def _strip_row(row):
+    """Row without trailing empty cells, for comparing API reads."""
+    end = len(row)
+    while end and row[end - 1] == '':
+        end -= 1
+    return row[:end]
+
+def ledger_tail_range(sheet_name, cached_rows):
+    """A1 range from the last cached row down, or None if there is nothing to extend."""
+    if len(cached_rows) <= 1:
+        return None
+    width = max(len(cached_rows[0]), 1)
+    return f"'{sheet_name}'!A{len(cached_rows)}:{column_letter(width)}"
+
+def extend_ledger_rows(cached_rows, tail):
+    """`cached_rows` plus the new rows of a tail read, or None if the sheet was edited.
+    
+    The ledger sheets are append-only, so a tail read starts at the last cached
+    row; if that row no longer matches, the caller has to do a full read.
+    """
+    if not tail or _strip_row(tail[0]) != _strip_row(cached_rows[-1]):
+        return None
+    
+    width = max(len(cached_rows[0]), 1)
+    new_rows = [row + [''] * (width - len(row)) for row in tail[1:]]
+    return cached_rows + new_rows
+
+def fetch_ledger_tail(sheet_name, cached_rows):
+    """Fetch only the rows added since `cached_rows` was read (None -> do a full read)."""
+    tail_range = ledger_tail_range(sheet_name, cached_rows)
+    if tail_range is None:
+        return None
+    try:
+        tail = spreadsheet.values_get(tail_range).get('values', [])
+    except Exception:
+        return None
+    return extend_ledger_rows(cached_rows, tail)
+
+def ledger_is_fresh(sheet_name, now):
+    """Whether a sheet's ROWS_CACHE entry can be served without a read."""
+    cached = ROWS_CACHE.get(sheet_name)
+    return bool(cached) and now - cached['timestamp'] < ROWS_CACHE_TTL
+
+def prefetch_ledgers(sheet_names=LEDGER_SHEETS):
+    """Refresh every stale ledger sheet with one values_batch_get instead of a read per sheet.
+    
+    Anything this can't settle (a failed call, an edited sheet) is left stale
+    for load_ledger to re-read on its own.
+    """
+    now = time.time()
+    stale = [name for name in sheet_names if not ledger_is_fresh(name, now)]
+    if len(stale) < 2 or not get_spreadsheet():
+        return
+    
+    # Rows queued for these sheets must reach Sheets before they are re-read
+    flush_before_read()
+    
+    ranges = []
+    tails = []
+    for name in stale:
+        cached = ROWS_CACHE.get(name)
+        tail_range = None
+        if cached and now - cached['loaded_at'] < ROWS_FULL_REFRESH:
+            tail_range = ledger_tail_range(name, cached['rows'])
+        tails.append(tail_range is not None)
+        ranges.append(tail_range or f"'{name}'")
+    
+    try:
+        value_ranges = spreadsheet.values_batch_get(ranges).get('valueRanges', [])
+    except Exception:
+        return
+    
+    for name, is_tail, value_range in zip(stale, tails, value_ranges):
+        values = value_range.get('values', [])
+        if is_tail:
+            cached = ROWS_CACHE[name]
+            all_rows = extend_ledger_rows(cached['rows'], values)
+            if all_rows is not None:
+                store_ledger(name, all_rows, now, cached['loaded_at'])
+        else:
+            store_ledger(name, pad_rows(values), now, now)
+
+def load_ledger(sheet_name):
+    """Get the ROWS_CACHE entry for a sheet, fetching and parsing it when stale."""
+    now = time.time()
+    cached = ROWS_CACHE.get(sheet_name)
+    if ledger_is_fresh(sheet_name, now):
+        return cached
+    
+    # Rows queued for this sheet must reach Sheets before it is re-read
+    flush_before_read(sheet_name)
+    
+    all_rows = None
+    loaded_at = now
+    if cached and now - cached['loaded_at'] < ROWS_FULL_REFRESH:
+        all_rows = fetch_ledger_tail(sheet_name, cached['rows'])
+        if all_rows is not None:
+            loaded_at = cached['loaded_at']
+    
+    if all_rows is None:
+        worksheet = get_worksheet(sheet_name)
+        all_rows = worksheet.get_all_values()
+    
+    return store_ledger(sheet_name, all_rows, now, loaded_at)
+
+def store_ledger(sheet_name, all_rows, now, loaded_at):
+    """Parse freshly read ledger rows and cache them with their indexes in ROWS_CACHE."""
+    # Header -> column index, resolved once per fill
+    columns = header_index(all_rows[0]) if all_rows else {}
+    essential_ok = all(c in columns for c in LEDGER_ESSENTIAL_COLUMNS)
+    transactions = parse_transactions(sheet_name, all_rows, columns, essential_ok)
+    
+    # ID -> transaction (first occurrence wins, like a top-down scan)
+    ids = {}
+    for trans in transactions:
+        if trans['id']:
+            ids.setdefault(trans['id'], trans)
+    
+    # Date column kept sorted (with each entry's position) so date windows are a bisect
+    date_order = sorted(range(len(transactions)), key=lambda i: transactions[i]['date'])
+    
+    entry = {
+        'timestamp': now,
+        'loaded_at': loaded_at,
+        'rows': all_rows,
+        'columns': columns,
+        'essential_ok': essential_ok,
+        'transactions': transactions,
+        'ids': ids,
+        'date_order': date_order,
+        'dates': [transactions[i]['date'] for i in date_order]
+    }
+    ROWS_CACHE[sheet_name] = entry
+    return entry
+
+def load_transactions(sheet_name):
+    """Parse every transaction in a sheet, served from ROWS_CACHE while fresh."""
+    return load_ledger(sheet_name)['transactions']
+
+def transactions_between(sheet_name, start_date=None, end_date=None):
+    """Transactions dated within [start_date, end_date], in sheet order."""
+    entry = load_ledger(sheet_name)
+    transactions = entry['transactions']
+    if not start_date and not end_date:
+        return transactions
+    
+    dates = entry['dates']
+    lo = bisect_left(dates, start_date) if start_date else 0
+    hi = bisect_right(dates, end_date) if end_date else len(dates)
+    return [transactions[i] for i in sorted(entry['date_order'][lo:hi])]
+
+def net_total_between(sheet_name, start_date=None, end_date=None):
+    """Income minus spending over a sheet's transactions dated within [start_date, end_date], without listing them."""
+    entry = load_ledger(sheet_name)
+    transactions = entry['transactions']
+    dates = entry['dates']
+    lo = bisect_left(dates, start_date) if start_date else 0
+    hi = bisect_right(dates, end_date) if end_date else len(dates)
+    
+    total = 0.0
+    for i in entry['date_order'][lo:hi]:
+        t = transactions[i]
+        if t['type'] in INCOME_TYPES:
+            total += t['amount']
+        else:
+            total -= t['amount']
+    return total
+
+def lookup_transaction(sheet_name, transaction_id):
+    """Find a transaction by ID in a sheet through the cached ID index."""
+    return load_ledger(sheet_name)['ids'].get(transaction_id)
+
+def legacy_row_index(sheet_name):
+    """(date, user, amount) -> 1-based row for a sheet, built lazily from the cached rows."""
+    entry = load_ledger(sheet_name)
+    index = entry.get('legacy_index')
+    if index is not None:
+        return index
+    
+    index = {}
+    columns = entry['columns']
+    date_idx = columns.get('date', -1)
+    amount_idx = columns.get('amount', -1)
+    user_idx = columns.get('user', -1)
+    width = max(date_idx, amount_idx, user_idx)
+    for i, row in enumerate(entry['rows'][1:], start=2):
+        if len(row) <= width:
+            continue
+        try:
+            key = (row[date_idx].strip(), row[user_idx].strip(), round(float(row[amount_idx]), 2))
+        except ValueError:
+            continue
+        # First match wins, like a top-down scan
+        index.setdefault(key, i)
+    
+    entry['legacy_index'] = index
+    return index
+
+def iter_ledger_transactions():
+    """Yield every cached transaction from Sales, Expenses and Income in one stream."""
+    prefetch_ledgers()
+    for sheet_name in LEDGER_SHEETS:
+        try:
+            yield from load_transactions(sheet_name)
+        except Exception:
+            continue
+
+def invalidate_transactions(sheet_name=None):
+    """Drop cached ledger rows for one sheet (or all sheets)."""
+    if sheet_name is None:
+        ROWS_CACHE.clear()
+    else:
+        ROWS_CACHE.pop(sheet_name, None)
+
+def mark_transactions_appended(sheet_name):
+    """Rows were appended to a sheet: the next read only needs to fetch the new tail."""
+    cached = ROWS_CACHE.get(sheet_name)
+    if cached:
+        cached['timestamp'] = 0
+
+# ==================== BATCHED WRITES ====================
+def cell_value(value):
+    """Sheets API cell for a Python value, stored as-is (like append_row's RAW mode)."""
+    if isinstance(value, bool):
+        return {'userEnteredValue': {'boolValue': value}}
+    if isinstance(value, (int, float)):
+        return {'userEnteredValue': {'numberValue': value}}
+    return {'userEnteredValue': {'stringValue': str(value)}}
+
+def append_row_request(worksheet, row):
+    """batch_update request that appends a row after the last row with data."""
+    return {
+        'appendCells': {
+            'sheetId': worksheet.id,
+            'rows': [{'values': [cell_value(v) for v in row]}],
+            'fields': 'userEnteredValue'
+        }
+    }
+
+def update_row_request(worksheet, row_index, col_index, values):
+    """batch_update request that overwrites cells in one row (1-based row/col)."""
+    return {
+        'updateCells': {
+            'start': {'sheetId': worksheet.id, 'rowIndex': row_index - 1, 'columnIndex': col_index - 1},
+            'rows': [{'values': [cell_value(v) for v in values]}],
+            'fields': 'userEnteredValue'
+        }
+    }
+
+def delete_row_request(worksheet, row_index):
+    """batch_update request that deletes one row (1-based)."""
+    return {
+        'deleteDimension': {
+            'range': {'sheetId': worksheet.id, 'dimension': 'ROWS', 'startIndex': row_index - 1, 'endIndex': row_index}
+        }
+    }
+
+def update_row_values(worksheet, row_index, values, col_index=1):
+    """Overwrite consecutive cells of one row in a single call (parsed like update_cell)."""
+    invalidate_sheet_rows(worksheet.title)
+    start = f"{column_letter(col_index)}{row_index}"
+    end = f"{column_letter(col_index + len(values) - 1)}{row_index}"
+    return worksheet.update(f"{start}:{end}", [values], value_input_option='USER_ENTERED')
+
+# values.append target per sheet; appending from A1 lets Sheets find the end of the table
+APPEND_RANGE = {
+    name: f"'{name}'!A1"
+    for name in ['Sales', 'Expenses', 'Income', 'DeletedTransactions', 'PriceRanges', 'PriceHistory',
+                 'Budgets', 'Orders', 'Goals', 'Recurring', 'UserContext']
+}
+
+def append_values(sheet_name, rows):
+    """Append rows with one values.append call (stored as-is, inserted as new rows)."""
+    invalidate_sheet_rows(sheet_name)
+    append_range = APPEND_RANGE.get(sheet_name) or f"'{sheet_name}'!A1"
+    return get_spreadsheet().values_append(
+        append_range,
+        {'valueInputOption': 'RAW', 'insertDataOption': 'INSERT_ROWS', 'includeValuesInResponse': False},
+        {'values': rows}
+    )
+
+# ==================== PENDING WRITES ====================
+# record_transaction queues its batch_update requests here and replies straight
+# away; they are sent in one request by flush_pending_writes(), which runs after
+# the reply is delivered, before any read of a sheet with queued rows, and from
+# a background thread for long-running processes. A request Sheets rejects is
+# dropped on its own. Appends are not idempotent, so a batch is only resent
+# as-is when the failure shows it never reached Sheets; after any other failure
+# its check row is looked up first. A batch still failing after
+# WRITE_MAX_ATTEMPTS is dropped, and the webhook tells the user.
+PENDING_WRITES = []  # queued batches, see queue_writes
+PENDING_SHEETS = set()
+WRITE_LOCK = threading.Lock()
+WRITE_EVENT = threading.Event()
+WRITE_FLUSH_DELAY = 0.5  # seconds to wait for more writes before flushing
+WRITE_MAX_ATTEMPTS = 3  # failed sends of one batch before it is dropped
+WRITE_CHECK_ROWS = 100  # rows above the cached end of a sheet searched for a batch's check row
+_flush_thread = None
+
+def queue_writes(sheet_names, requests, check=None):
+    """Queue batch_update requests touching `sheet_names` for the next flush.
+    
+    `check` is (sheet, 0-based column, value) naming a cell of one row the
+    batch appends, so a send that failed midway can be checked before a resend.
+    """
+    global _flush_thread
+    with WRITE_LOCK:
+        PENDING_WRITES.append({
+            'requests': list(requests),
+            'sheets': list(sheet_names),
+            'check': check,
+            'attempts': 0,
+            'verify': False  # set when the last send may have been applied
+        })
+        PENDING_SHEETS.update(sheet_names)
+        for name in sheet_names:
+            invalidate_sheet_rows(name)
+        if _flush_thread is None:
+            _flush_thread = threading.Thread(target=_flush_loop, daemon=True)
+            _flush_thread.start()
+    WRITE_EVENT.set()
+
+def is_invalid_request(error):
+    """Whether Sheets rejected a batch_update as invalid (HTTP 400), so resending it can never succeed."""
+    return getattr(getattr(error, 'response', None), 'status_code', None) == 400
+
+def write_not_applied(error):
+    """Whether a failed batch_update certainly never reached Sheets (rate limited, or no connection made)."""
+    if getattr(getattr(error, 'response', None), 'status_code', None) == 429:
+        return True
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        return isinstance(getattr(error.args[0], 'reason', None), NewConnectionError)
+    return False
+
+def send_writes(requests):
+    """Send requests in order with batch_update, splitting any batch Sheets rejects as invalid.
+    
+    A rejected batch is applied not at all, so it is halved until the bad
+    requests are isolated; those are logged and dropped. Any other failure
+    stops the run. Returns (requests still unsent, number dropped, that failure).
+    """
+    dropped = 0
+    batches = [requests]  # next batch to send is last
+    while batches:
+        batch = batches.pop()
+        try:
+            spreadsheet.batch_update({'requests': batch})
+        except Exception as e:
+            if not is_invalid_request(e):
+                print(f"❌ Failed to flush {len(batch)} pending writes: {e}")
+                return batch + [r for b in reversed(batches) for r in b], dropped, e
+            if len(batch) == 1:
+                print(f"❌ Dropping invalid write {json.dumps(batch[0])}: {e}")
+                dropped += 1
+            else:
+                mid = len(batch) // 2
+                batches.append(batch[mid:])
+                batches.append(batch[:mid])
+    return [], dropped, None
+
+def batch_landed(batch):
+    """Whether a batch whose last send failed midway was applied anyway.
+    
+    Looks for its check row near the end of the sheet. None when that can't
+    be told: no check row (only overwrites are then safe to send again) or
+    the lookup failed.
+    """
+    check = batch['check']
+    if check is None:
+        return False if all('updateCells' in r for r in batch['requests']) else None
+    
+    sheet_name, column, value = check
+    cached = ROWS_CACHE.get(sheet_name)
+    start = max(1, len(cached['rows']) - WRITE_CHECK_ROWS) if cached else 1
+    letter = column_letter(column + 1)
+    try:
+        values = spreadsheet.values_get(f"'{sheet_name}'!{letter}{start}:{letter}").get('values', [])
+    except Exception as e:
+        print(f"❌ Could not check whether {value} reached {sheet_name}: {e}")
+        return None
+    return any(row and row[0].strip() == value for row in values)
+
+def retry_later(batch, error):
+    """Count a failed send against a batch; False once it has used up its attempts (it is then dropped)."""
+    batch['attempts'] += 1
+    batch['verify'] = not write_not_applied(error)
+    if batch['attempts'] < WRITE_MAX_ATTEMPTS:
+        return True
+    print(f"❌ Dropping {len(batch['requests'])} pending writes after {batch['attempts']} failed sends: {json.dumps(batch['requests'])}")
+    return False
+
+def send_batches(batches):
+    """Send queued batches in one batch_update, settling each on its own if that fails.
+    
+    Returns (batches to retry, number of batches dropped or cut short).
+    """
+    # A batch whose last send may have gone through is resent only once its check row is known to be missing
+    ready = []
+    kept = []
+    dropped = 0
+    for batch in batches:
+        if not batch['verify']:
+            ready.append(batch)
+            continue
+        landed = batch_landed(batch)
+        if landed:
+            continue
+        if landed is None:
+            if batch['check'] is None:
+                print(f"❌ Dropping {len(batch['requests'])} pending writes that may already be saved: {json.dumps(batch['requests'])}")
+                dropped += 1
+            else:
+                kept.append(batch)
+            continue
+        batch['verify'] = False
+        ready.append(batch)
+    if not ready:
+        return kept, dropped
+    
+    try:
+        spreadsheet.batch_update({'requests': [r for b in ready for r in b['requests']]})
+        return kept, dropped
+    except Exception as e:
+        error = e
+    
+    if not is_invalid_request(error):
+        print(f"❌ Failed to flush {len(ready)} pending write batches: {error}")
+        for batch in ready:
+            if retry_later(batch, error):
+                kept.append(batch)
+            else:
+                dropped += 1
+        return kept, dropped
+    
+    # Nothing was applied; send batch by batch so only the bad requests are lost
+    for i, batch in enumerate(ready):
+        unsent, bad, error = send_writes(batch['requests'])
+        if bad:
+            dropped += 1
+        if not unsent:
+            continue
+        if len(unsent) < len(batch['requests']):
+            # Part of it went out, so its check row no longer says anything about the rest
+            batch['requests'] = unsent
+            batch['check'] = None
+        if retry_later(batch, error):
+            kept.append(batch)
+        else:
+            dropped += 1
+        kept.extend(ready[i + 1:])
+        break
+    return kept, dropped
+
+def flush_pending_writes(sheet_name=None):
+    """Send queued writes in one batch_update (only if `sheet_name` has any, when given).
+    
+    Returns False when queued writes were dropped without reaching Sheets;
+    writes kept for a later retry don't count (see pending_writes_for).
+    """
+    with WRITE_LOCK:
+        if not PENDING_WRITES:
+            return True
+        if sheet_name is not None and sheet_name not in PENDING_SHEETS:
+            return True
+        
+        kept, dropped = send_batches(list(PENDING_WRITES))
+        sheets = set(PENDING_SHEETS)
+        PENDING_WRITES[:] = kept
+        PENDING_SHEETS.clear()
+        for batch in kept:
+            PENDING_SHEETS.update(batch['sheets'])
+        sheets -= PENDING_SHEETS
+    
+    for name in sheets:
+        mark_transactions_appended(name)
+    return not dropped
+
+def pending_writes_for(sheet_name=None):
+    """Whether writes for `sheet_name` (any sheet, when None) are still queued."""
+    with WRITE_LOCK:
+        return bool(PENDING_WRITES) if sheet_name is None else sheet_name in PENDING_SHEETS
+
+def flush_before_read(sheet_name=None):
+    """Flush queued writes ahead of a sheet read, logging when the read will be missing some of them."""
+    flush_pending_writes(sheet_name)
+    if pending_writes_for(sheet_name):
+        print(f"⚠️ Reading {sheet_name or 'ledger sheets'} while some of its queued writes are still unsaved")
+
+def _flush_loop():
+    """Background flusher: wait for queued writes, let a burst collect, then send it."""
+    while True:
+        WRITE_EVENT.wait()
+        time.sleep(WRITE_FLUSH_DELAY)
+        WRITE_EVENT.clear()
+        flush_pending_writes()
+
+atexit.register(flush_pending_writes)
+
+# ==================== SHEET ROWS CACHE ====================
+def sheet_rows(sheet_name, force=False):
+    """All rows of a sheet (header first), served from SHEET_ROWS_CACHE while fresh.
+    
+    Callers that write back by row number pass force=True to read the live sheet.
+    """
+    now = time.time()
+    cached = SHEET_ROWS_CACHE.get(sheet_name)
+    if not force and cached and now - cached['timestamp'] < SHEET_ROWS_TTL:
+        return cached['rows']
+    
+    # Queued rows for this sheet must reach Sheets before it is re-read
+    flush_before_read(sheet_name)
+    if sheet_name in SHEET_ROWS_COLUMNS:
+        rows = pad_rows(get_spreadsheet().values_get(sheet_rows_range(sheet_name)).get('values', []))
+    else:
+        rows = get_worksheet(sheet_name).get_all_values()
+    SHEET_ROWS_CACHE[sheet_name] = {'rows': rows, 'timestamp': now}
+    return rows
+
+def sheet_rows_range(sheet_name):
+    """A1 range that sheet_rows reads for a sheet: its column span if it has one, else the whole sheet."""
+    columns = SHEET_ROWS_COLUMNS.get(sheet_name)
+    return f"'{sheet_name}'!{columns}" if columns else f"'{sheet_name}'"
+
+def sheet_row_keys(sheet_name):
+    """(rows, keys) for a sheet, where keys[i] is rows[i + 1][0] stripped and lowercased (built once per cache fill)."""
+    rows = sheet_rows(sheet_name)
+    cached = SHEET_ROWS_CACHE[sheet_name]
+    if 'keys' not in cached:
+        cached['keys'] = [row[0].strip().lower() if row else '' for row in rows[1:]]
+    return rows, cached['keys']
+
+def invalidate_sheet_rows(sheet_name):
+    """Drop a sheet's cached rows so the next read reloads from Sheets."""
+    SHEET_ROWS_CACHE.pop(sheet_name, None)
+
 # ==================== AI MEMORY (USER CONTEXT) ====================
 def ensure_user_context_sheet():
     """Ensure the UserContext sheet exists for AI memory."""
-    if not spreadsheet:
+    if not get_spreadsheet():
+        return
+    if 'UserContext' in ENSURED_SHEETS:
         return
     try:
-        spreadsheet.worksheet('UserContext')
+        get_worksheet('UserContext')
     except gspread.exceptions.WorksheetNotFound:
         # Create it with headers
-        sheet = spreadsheet.add_worksheet(title='UserContext', rows=1000, cols=5)
+        sheet = create_worksheet(title='UserContext', rows=1000, cols=5)
         sheet.append_row(['UserID', 'MemoryKey', 'MemoryValue', 'Timestamp', 'IsActive'])
+    ENSURED_SHEETS.add('UserContext')
 
 def get_user_context_memory(user_name):
     """Fetch all active long-term memories for a user as a string."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return ""
         
     # Check cache first (valid for 5 minutes)
@@ -76,7 +785,7 @@ def get_user_context_memory(user_name):
             return cache_entry['memory']
             
     try:
-        sheet = spreadsheet.worksheet('UserContext')
+        sheet = get_worksheet('UserContext')
         all_rows = sheet.get_all_values()
         if len(all_rows) <= 1:
             return ""
@@ -101,14 +810,13 @@ def get_user_context_memory(user_name):
 
 def save_user_context_memory(user_name, memory_value):
     """Save a new long-term memory learned by the AI."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return
     try:
-        sheet = spreadsheet.worksheet('UserContext')
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         # MemoryKey is just a hash or generic string for now
         memory_key = f"mem_{int(time.time())}"
-        sheet.append_row([user_name, memory_key, memory_value, timestamp, 'TRUE'])
+        append_values('UserContext', [[user_name, memory_key, memory_value, timestamp, 'TRUE']])
         
         # Clear cache so it fetches fresh next time
         if user_name in USER_CONTEXT_CACHE:
@@ -118,22 +826,46 @@ def save_user_context_memory(user_name, memory_value):
         print(f"Error saving user context: {e}")
 
 # ==================== HELPER FUNCTIONS ====================
+@functools.lru_cache(maxsize=16)
+def _prefix(trans_type):
+    """Transaction ID prefix for a type (sale -> SAL)."""
+    return trans_type[:3].upper()
+
+# Seeded once from the OS so separate processes start at different points
+TRANSACTION_ID_COUNTER = itertools.count(secrets.randbits(24))
+
 def generate_transaction_id(trans_type):
     """Generate unique transaction ID: TYPE-ABC123"""
-    prefix = trans_type[:3].upper()
-    random_part = secrets.token_hex(3).upper()  # 6 random hex chars
-    return f"{prefix}-{random_part}"
+    # 6 hex chars; unique within a process for 16M IDs, no entropy read per call
+    return f"{_prefix(trans_type)}-{next(TRANSACTION_ID_COUNTER) & 0xFFFFFF:06X}"
 
+# Pure, and the same budget/total/price amounts are formatted over and over
+@functools.lru_cache(maxsize=4096)
 def format_cedi(amount):
     """Format amount as Ghanaian Cedi with proper negative handling."""
+    # Fast path: callers almost always pass numbers already.
+    # `+ 0` turns -0.0 into 0.0; they share a cache slot, so -0.0 must not print "₵-0.00"
+    if isinstance(amount, (int, float)):
+        if amount < 0:
+            return f"-₵{-amount:,.2f}"
+        return f"₵{amount + 0:,.2f}"
     try:
         amount_float = float(amount)
         if amount_float < 0:
             return f"-₵{abs(amount_float):,.2f}"
-        return f"₵{amount_float:,.2f}"
+        return f"₵{amount_float + 0:,.2f}"
     except (ValueError, TypeError):
         return f"₵{amount}"
 
+# Sheets repeat the same few dates across many rows, so each string is parsed once
+@functools.lru_cache(maxsize=1024)
+def parse_day(date_str):
+    """'YYYY-MM-DD' -> datetime, or None if it doesn't parse."""
+    try:
+        return datetime.strptime(date_str, '%Y-%m-%d')
+    except ValueError:
+        return None
+
 def find_column_index(headers, column_name):
     """Find column index safely."""
     if not headers:
@@ -145,12 +877,19 @@ def find_column_index(headers, column_name):
     except ValueError:
         return -1
 
+def header_index(headers):
+    """Map lowercased header -> column index (first occurrence), for O(1) column lookups."""
+    index = {}
+    for i, header in enumerate(headers):
+        index.setdefault(header.strip().lower(), i)
+    return index
+
 def normalize_phone_number(phone_str):
     """Normalize phone number to last 9 digits for matching (+23324... vs 024...)."""
     if not phone_str:
         return ""
     # Remove all non-digits
-    digits = re.sub(r'\D', '', str(phone_str))
+    digits = NON_DIGIT_RE.sub('', str(phone_str))
     # Return last 9 digits (standard in Ghana for mobile matching)
     return digits[-9:] if len(digits) >= 9 else digits
 
@@ -158,75 +897,102 @@ def normalize_phone_number(phone_str):
 class CorrectionState:
     """Manages interactive price correction states"""
     
+    TTL = 300  # 5 minutes expiry
+    MAX_STATES = 1000
+    
     def __init__(self):
-        self.states = {}
-    
-    def add_correction(self, user_id, transaction_id, item, amount, min_price, max_price, sheet_name, row_data):
-        """Store a pending correction"""
-        state_id = f"{user_id}_{int(time.time())}"
-        self.states[state_id] = {
-            'user_id': user_id,
-            'transaction_id': transaction_id,
-            'item': item,
-            'amount': amount,
-            'min_price': min_price,
-            'max_price': max_price,
-            'sheet_name': sheet_name,
-            'row_data': row_data,
-            'timestamp': time.time(),
-            'expires_at': time.time() + 300  # 5 minutes expiry
-        }
-        # Clean up old states
-        self.cleanup()
+        # Insertion-ordered, so the oldest state is evicted first and the newest found first
+        self.states = OrderedDict()
+        self._expiry = []  # heap of (expires_at, key)
+        self._ids = itertools.count()
+        self.lock = threading.Lock()
+    
+    def _store(self, key, state, now):
+        """Insert a state, then drop expired ones and the oldest beyond MAX_STATES (lock held)"""
+        self.states[key] = state
+        heapq.heappush(self._expiry, (state['expires_at'], key))
+        self._cleanup(now)
+        while len(self.states) > self.MAX_STATES:
+            self.states.popitem(last=False)
+    
+    def add_correction(self, user_id, item, amount, min_price, max_price):
+        """Store a pending correction (only the fields the reply handler reads)"""
+        now = time.time()
+        with self.lock:
+            # A counter, not the clock: an item and its category are flagged in the same second
+            state_id = f"{user_id}_{next(self._ids)}"
+            self._store(state_id, {
+                'item': item,
+                'amount': amount,
+                'min_price': min_price,
+                'max_price': max_price,
+                'expires_at': now + self.TTL
+            }, now)
         return state_id
     
+    def add_transaction(self, transaction_id, user_id, state_ids):
+        """Group a transaction's corrections so one numbered reply answers them all"""
+        now = time.time()
+        with self.lock:
+            self._store(transaction_id, {
+                'state_ids': state_ids,
+                'user_id': user_id,
+                'expires_at': now + self.TTL
+            }, now)
+    
+    def latest_transaction(self, user_id):
+        """(transaction_id, state) of the user's newest unexpired correction group, or (None, None)"""
+        now = time.time()
+        with self.lock:
+            for key in reversed(self.states):
+                state = self.states[key]
+                if state.get('user_id') == user_id and 'state_ids' in state and now < state['expires_at']:
+                    return key, state
+        return None, None
+    
     def get_correction(self, state_id):
         """Get a correction state"""
-        state = self.states.get(state_id)
-        if state and time.time() < state['expires_at']:
-            return state
-        if state:
-            del self.states[state_id]
+        with self.lock:
+            state = self.states.get(state_id)
+            if state and time.time() < state['expires_at']:
+                return state
+            if state:
+                del self.states[state_id]
         return None
     
+    def _cleanup(self, now):
+        """Pop expired states off the expiry heap (lock held)"""
+        expiry = self._expiry
+        while expiry and expiry[0][0] < now:
+            _, key = heapq.heappop(expiry)
+            state = self.states.get(key)
+            if state and state['expires_at'] < now:
+                del self.states[key]
+    
     def cleanup(self):
         """Remove expired states"""
-        current_time = time.time()
-        expired = [k for k, v in self.states.items() if current_time > v['expires_at']]
-        for k in expired:
-            del self.states[k]
+        with self.lock:
+            self._cleanup(time.time())
     
     def remove_correction(self, state_id):
         """Remove a correction state"""
-        if state_id in self.states:
-            del self.states[state_id]
+        with self.lock:
+            self.states.pop(state_id, None)
 
 correction_state = CorrectionState()
 
 def handle_correction_response(user_input, user_name):
     """Handle user's response to price correction prompts."""
     # Clean input
-    numbers = []
-    for part in user_input.split(','):
-        part = part.strip()
-        if part.isdigit():
-            numbers.append(int(part))
+    numbers = [int(part) for part in map(str.strip, user_input.split(',')) if part.isdecimal()]
     
     if not numbers:
         return None
     
-    # Find active corrections for this user
-    active_corrections = []
-    for trans_id, state in correction_state.states.items():
-        # Only process transaction-level states that have state_ids
-        if state.get('user_id') == user_name and 'state_ids' in state and time.time() < state['expires_at']:
-            active_corrections.append((trans_id, state))
-    
-    if not active_corrections:
+    # Get the user's most recent active correction
+    trans_id, state = correction_state.latest_transaction(user_name)
+    if not trans_id:
         return None
-    
-    # Get the most recent correction
-    trans_id, state = active_corrections[-1]
     state_ids = state['state_ids']
     
     responses = []
@@ -257,13 +1023,8 @@ def handle_correction_response(user_input, user_name):
                 new_min = min(min_price, amount)
                 new_max = max(max_price, amount)
                 
-                # Determine if item or category
-                if item.startswith('#'):
-                    # It's a category
-                    result = train_price(item, new_min, new_max, "", user_name)
-                else:
-                    # It's an item
-                    result = train_price(item, new_min, new_max, "", user_name)
+                # Items and #categories train the same way (train_price sets the type)
+                train_price(item, new_min, new_max, "", user_name)
                 
                 responses.append(f"📊 Updated price range for {item}: {format_cedi(new_min)}-{format_cedi(new_max)}")
                 
@@ -271,7 +1032,7 @@ def handle_correction_response(user_input, user_name):
                 responses.append(f"✅ Noted: {item} at {format_cedi(amount)} is correct (ignoring warning)")
     
     # Clean up
-    del correction_state.states[trans_id]
+    correction_state.remove_correction(trans_id)
     for state_id in state_ids:
         correction_state.remove_correction(state_id)
     
@@ -283,16 +1044,8 @@ def handle_correction_response(user_input, user_name):
 # ==================== UNIT PRICE INTELLIGENCE ====================
 def detect_quantity_and_unit(description):
     """Detect quantity and unit from description."""
-    # Patterns to detect: "10 chairs", "5kg sugar", "3 reams of paper"
-    patterns = [
-        r'(\d+)\s*(?:x\s*)?([a-zA-Z]+)\b',  # "10 chairs" or "10 x chairs"
-        r'(\d+)\s*([a-zA-Z]{1,3})\s+of\s+',  # "3 reams of paper"
-        r'for\s+(\d+)\s+([a-zA-Z]+)',  # "for 10 people"
-        r'(\d+(?:\.\d+)?)\s*([a-zA-Z]{2,})\b',  # "2.5kg sugar"
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, description, re.IGNORECASE)
+    for pattern in QUANTITY_PATTERNS:
+        match = pattern.search(description)
         if match:
             quantity = float(match.group(1))
             unit = match.group(2).lower()
@@ -312,6 +1065,10 @@ def calculate_unit_price(amount, description):
 
 def auto_suggest_price(item_name, user_name):
     """Auto-suggest price for trained items."""
+    # Most messages aren't item names: a key probe on the mirror index rules them out
+    if not has_price_range(item_name):
+        return None
+    
     price_info = check_price(item_name, 0)
     
     if not price_info:
@@ -333,53 +1090,125 @@ def auto_suggest_price(item_name, user_name):
 # ==================== PRICE TRAINING SYSTEM ====================
 def ensure_price_ranges_sheet():
     """Ensure PriceRanges sheet exists with proper structure."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return False
+    if 'PriceRanges' in ENSURED_SHEETS:
+        return True
     
     price_columns = ['Item', 'Type', 'Min_Price', 'Max_Price', 'Unit', 
                     'Confidence', 'Trained_By', 'Last_Trained', 'Notes']
     
     try:
-        worksheet = spreadsheet.worksheet('PriceRanges')
-        current_headers = worksheet.row_values(1)
+        worksheet = get_worksheet('PriceRanges')
+        current_headers = header_row(worksheet)
         
         # Check if all columns exist
         if len(current_headers) < len(price_columns):
             # Add missing columns
-            for i, col in enumerate(price_columns):
-                if i >= len(current_headers):
-                    worksheet.update_cell(1, i+1, col)
+            update_row_values(worksheet, 1, price_columns[len(current_headers):], len(current_headers) + 1)
+        ENSURED_SHEETS.add('PriceRanges')
         return True
         
     except gspread.exceptions.WorksheetNotFound:
         # Create new sheet
-        worksheet = spreadsheet.add_worksheet(
+        worksheet = create_worksheet(
             title='PriceRanges',
             rows=1000,
             cols=len(price_columns)
         )
         worksheet.append_row(price_columns)
+        ENSURED_SHEETS.add('PriceRanges')
         return True
     except Exception:
         return False
 
+def _index_price_ranges(rows):
+    """Map lowercased item name -> positions of its rows in the mirror."""
+    index = {}
+    for pos, row in enumerate(rows):
+        if row and row[0]:
+            index.setdefault(row[0].strip().lower(), []).append(pos)
+    return index
+
+def load_price_ranges(force=False):
+    """Return PriceRanges data rows (no header) from the in-memory mirror, refreshing when stale."""
+    cache = PRICE_RANGES_CACHE
+    now = time.time()
+    if not force and cache['rows'] is not None and now - cache['timestamp'] < PRICE_RANGES_TTL:
+        return cache['rows']
+    
+    worksheet = get_worksheet('PriceRanges')
+    return store_price_ranges(worksheet.get_all_values(), now)
+
+def store_price_ranges(all_rows, now):
+    """Refill the PriceRanges mirror from freshly read rows (header first); returns the data rows."""
+    cache = PRICE_RANGES_CACHE
+    rows = pad_rows_to(all_rows[1:], PRICE_RANGES_WIDTH)
+    cache['rows'] = rows
+    cache['index'] = _index_price_ranges(rows)
+    cache['typed'] = cache['detect'] = None
+    cache['timestamp'] = now
+    return rows
+
+def has_price_range(item_name):
+    """True if any PriceRanges row exists for an item/category (a mirror key lookup)."""
+    try:
+        load_price_ranges()
+    except Exception:
+        return False
+    return item_name.strip().lower() in PRICE_RANGES_CACHE['index']
+
+def invalidate_price_ranges():
+    """Drop the PriceRanges mirror so the next read reloads from Sheets."""
+    PRICE_RANGES_CACHE['rows'] = None
+    PRICE_RANGES_CACHE['index'] = {}
+    PRICE_RANGES_CACHE['typed'] = PRICE_RANGES_CACHE['detect'] = None
+
+def typed_price_ranges():
+    """PriceRanges rows with numbers parsed, position for position, once per mirror change.
+    
+    Each entry is (name, min, max, unit, confidence, trained_by, last_trained), or None for
+    rows without a name or with unreadable prices. max is None when blank, confidence None
+    when unreadable.
+    """
+    rows = load_price_ranges()
+    typed = PRICE_RANGES_CACHE['typed']
+    if typed is not None:
+        return typed
+    
+    typed = []
+    for row in rows:
+        name, _type, min_s, max_s, unit, conf_s, trained_by, last_trained = row[:8]
+        try:
+            if not name:
+                raise ValueError
+            min_price = float(min_s) if min_s else 0
+            max_price = float(max_s) if max_s else None
+        except ValueError:
+            typed.append(None)
+            continue
+        try:
+            confidence = int(conf_s) if conf_s else 50
+        except ValueError:
+            confidence = None
+        typed.append((name, min_price, max_price, unit, confidence, trained_by, last_trained))
+    
+    PRICE_RANGES_CACHE['typed'] = typed
+    return typed
+
 def train_price(item_name, min_price, max_price, unit="", user_name="User"):
     """Train the bot on price ranges for items/categories."""
     if not ensure_price_ranges_sheet():
         return "❌ Cannot access PriceRanges sheet."
     
     try:
-        worksheet = spreadsheet.worksheet('PriceRanges')
-        all_rows = worksheet.get_all_values()
+        worksheet = get_worksheet('PriceRanges')
+        rows = load_price_ranges()
         
         # Check if item already exists
         item_lower = item_name.strip().lower()
-        row_index = None
-        
-        for i, row in enumerate(all_rows[1:], start=2):
-            if row and len(row) > 0 and row[0].strip().lower() == item_lower:
-                row_index = i
-                break
+        positions = PRICE_RANGES_CACHE['index'].get(item_lower)
+        row_index = positions[0] + 2 if positions else None
         
         # Determine type (item or category)
         item_type = "category" if item_name.startswith("#") else "item"
@@ -399,39 +1228,52 @@ def train_price(item_name, min_price, max_price, unit="", user_name="User"):
         
         if row_index:
             # Update existing row
-            for col, value in enumerate(training_data, start=1):
-                worksheet.update_cell(row_index, col, value)
+            update_row_values(worksheet, row_index, training_data)
+            rows[positions[0]] = [str(value) for value in training_data]
+            PRICE_RANGES_CACHE['typed'] = PRICE_RANGES_CACHE['detect'] = None
             action = "updated"
         else:
             # Add new row
-            worksheet.append_row(training_data)
+            result = append_values('PriceRanges', [training_data])
             action = "added"
+            
+            # Mirror the append only if Sheets put it right after the rows we know about
+            match = UPDATED_ROW_RE.search((result or {}).get('updates', {}).get('updatedRange', ''))
+            if match and int(match.group(1)) == len(rows) + 2:
+                rows.append([str(value) for value in training_data])
+                PRICE_RANGES_CACHE['index'].setdefault(item_lower, []).append(len(rows) - 1)
+                PRICE_RANGES_CACHE['typed'] = PRICE_RANGES_CACHE['detect'] = None
+            else:
+                invalidate_price_ranges()
         
         return f"✅ {action.capitalize()} price range for '{item_name}': ₵{min_price:,.2f} - ₵{max_price:,.2f}" + \
                (f" {unit}" if unit else "")
         
     except Exception as e:
+        invalidate_price_ranges()
         return f"❌ Training failed: {str(e)}"
 
 def forget_price(item_name):
     """Remove price training for an item."""
     try:
-        worksheet = spreadsheet.worksheet('PriceRanges')
-        all_rows = worksheet.get_all_values()
+        worksheet = get_worksheet('PriceRanges')
+        rows = load_price_ranges()
         
         item_lower = item_name.strip().lower()
-        rows_to_delete = []
-        
-        for i, row in enumerate(all_rows[1:], start=2):
-            if row and len(row) > 0 and row[0].strip().lower() == item_lower:
-                rows_to_delete.append(i)
+        positions = PRICE_RANGES_CACHE['index'].get(item_lower)
         
-        if not rows_to_delete:
+        if not positions:
             return f"❌ No price training found for '{item_name}'"
         
-        # Delete from bottom to maintain indices
-        for row in sorted(rows_to_delete, reverse=True):
-            worksheet.delete_rows(row)
+        # Delete from bottom to maintain indices, all rows in one request
+        positions = sorted(positions, reverse=True)
+        try:
+            get_spreadsheet().batch_update({'requests': [delete_row_request(worksheet, pos + 2) for pos in positions]})
+            for pos in positions:
+                del rows[pos]
+        finally:
+            PRICE_RANGES_CACHE['index'] = _index_price_ranges(rows)
+            PRICE_RANGES_CACHE['typed'] = PRICE_RANGES_CACHE['detect'] = None
         
         return f"✅ Forgot price training for '{item_name}'"
         
@@ -443,36 +1285,35 @@ def forget_price(item_name):
 def check_price(item_name, amount):
     """Check if amount is within trained price range."""
     try:
-        worksheet = spreadsheet.worksheet('PriceRanges')
-        all_rows = worksheet.get_all_values()
+        typed = typed_price_ranges()
         
         item_lower = item_name.strip().lower()
-        matches = []
+        best = None
+        best_conf = -1
         
-        # Search for exact matches
-        for row in all_rows[1:]:
-            if row and len(row) > 0 and row[0].strip().lower() == item_lower:
-                try:
-                    min_price = float(row[2]) if len(row) > 2 and row[2] else 0
-                    max_price = float(row[3]) if len(row) > 3 and row[3] else float('inf')
-                    unit = row[4] if len(row) > 4 else ""
-                    confidence = int(row[5]) if len(row) > 5 and row[5] else 50
-                    
-                    matches.append({
-                        'item': row[0],
-                        'min': min_price,
-                        'max': max_price,
-                        'unit': unit,
-                        'confidence': confidence
-                    })
-                except (ValueError, IndexError):
-                    continue
+        # Look up exact matches, keeping the highest confidence one
+        for pos in PRICE_RANGES_CACHE['index'].get(item_lower, ()):
+            entry = typed[pos]
+            if entry is None or entry[4] is None:
+                continue
+            confidence = entry[4]
+            if best is not None and confidence <= best_conf:
+                continue
+            best = entry
+            best_conf = confidence
+            if confidence >= 100:
+                break  # Nothing can outrank a fully confident range
         
-        if not matches:
+        if best is None:
             return None
         
-        # Return the best match (highest confidence)
-        best_match = max(matches, key=lambda x: x['confidence'])
+        best_match = {
+            'item': best[0],
+            'min': best[1],
+            'max': best[2] if best[2] is not None else float('inf'),
+            'unit': best[3],
+            'confidence': best[4]
+        }
         
         try:
             amount_float = float(amount)
@@ -503,118 +1344,117 @@ def check_price(item_name, amount):
 def list_trained_items():
     """List all trained price ranges."""
     try:
-        worksheet = spreadsheet.worksheet('PriceRanges')
-        all_rows = worksheet.get_all_values()
+        typed = typed_price_ranges()
         
-        if len(all_rows) <= 1:
+        if not typed:
             return "📭 No items have been trained yet. Use `+train` to add price ranges."
         
         items = []
-        for row in all_rows[1:]:
-            if row and row[0]:
-                try:
-                    items.append({
-                        'name': row[0],
-                        'min': float(row[2]) if len(row) > 2 and row[2] else 0,
-                        'max': float(row[3]) if len(row) > 3 and row[3] else 0,
-                        'unit': row[4] if len(row) > 4 else "",
-                        'confidence': int(row[5]) if len(row) > 5 and row[5] else 50,
-                        'trained_by': row[6] if len(row) > 6 else "Unknown",
-                        'last_trained': row[7] if len(row) > 7 else "Unknown"
-                    })
-                except (ValueError, IndexError):
-                    continue
+        for entry in typed:
+            if entry is None or entry[4] is None:
+                continue
+            name, min_price, max_price, unit, confidence, trained_by, last_trained = entry
+            items.append({
+                'name': name,
+                'min': min_price,
+                'max': max_price if max_price is not None else 0,
+                'unit': unit,
+                'confidence': confidence,
+                'trained_by': trained_by or "Unknown",
+                'last_trained': last_trained or "Unknown"
+            })
         
         if not items:
             return "📭 No valid price training found."
         
-        # Sort by confidence (highest first)
-        items.sort(key=lambda x: x['confidence'], reverse=True)
-        
-        response = "📚 **TRAINED PRICE RANGES:**\n\n"
+        parts = ["📚 **TRAINED PRICE RANGES:**\n\n"]
         
-        for i, item in enumerate(items[:15], 1):  # Show top 15
+        # Highest confidence first; only the top 15 are shown
+        for i, item in enumerate(heapq.nlargest(15, items, key=operator.itemgetter('confidence')), 1):
             emoji = "✅" if item['confidence'] > 80 else "⚠️" if item['confidence'] > 60 else "🤔"
-            response += f"{emoji} **{item['name']}**: ₵{item['min']:,.2f} - ₵{item['max']:,.2f}"
+            parts.append(f"{emoji} **{item['name']}**: ₵{item['min']:,.2f} - ₵{item['max']:,.2f}")
             if item['unit']:
-                response += f" {item['unit']}"
-            response += f"\n   Confidence: {item['confidence']}% | Trained by: {item['trained_by']}\n\n"
+                parts.append(f" {item['unit']}")
+            parts.append(f"\n   Confidence: {item['confidence']}% | Trained by: {item['trained_by']}\n\n")
         
         if len(items) > 15:
-            response += f"📋 Showing 15 of {len(items)} items. Use `price_check [item]` for details."
+            parts.append(f"📋 Showing 15 of {len(items)} items. Use `price_check [item]` for details.")
         
-        return response
+        return ''.join(parts)
         
     except gspread.exceptions.WorksheetNotFound:
         return "📭 No price training data found. Use `+train` to start training."
     except Exception:
         return "❌ Cannot access PriceRanges sheet."
 
+def item_detectors():
+    """(lowercased name, detection) for every usable PriceRanges row, parsed once per mirror change."""
+    typed = typed_price_ranges()
+    detectors = PRICE_RANGES_CACHE['detect']
+    if detectors is not None:
+        return detectors
+    
+    detectors = []
+    for entry in typed:
+        if entry is not None:
+            detectors.append((entry[0].lower(), {
+                'item': entry[0],
+                'min': entry[1],
+                'max': entry[2] if entry[2] is not None else 0,
+                'unit': entry[3]
+            }))
+    
+    PRICE_RANGES_CACHE['detect'] = detectors
+    return detectors
+
 def auto_detect_items_in_description(description):
     """Automatically detect trained items in a description."""
     try:
-        worksheet = spreadsheet.worksheet('PriceRanges')
-        all_rows = worksheet.get_all_values()
-        
-        detected = []
         description_lower = description.lower()
-        
-        for row in all_rows[1:]:
-            if row and row[0]:
-                item_lower = row[0].lower()
-                # Simple word matching (could be improved)
-                if item_lower in description_lower or f" {item_lower} " in f" {description_lower} ":
-                    try:
-                        detected.append({
-                            'item': row[0],
-                            'min': float(row[2]) if len(row) > 2 and row[2] else 0,
-                            'max': float(row[3]) if len(row) > 3 and row[3] else 0,
-                            'unit': row[4] if len(row) > 4 else ""
-                        })
-                    except (ValueError, IndexError):
-                        continue
-        
-        return detected
+        # Substring match; the old padded " item " test could only match when this one did
+        return [detection for item_lower, detection in item_detectors() if item_lower in description_lower]
     except Exception:
         return []
 
 # ==================== PRICE HISTORY & TRENDS ====================
 def ensure_price_history_sheet():
     """Ensure PriceHistory sheet exists."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return False
+    if 'PriceHistory' in ENSURED_SHEETS:
+        return True
     
     price_history_columns = ['Item', 'Date', 'Price', 'Type', 'Quantity', 'Unit', 
                            'User', 'Transaction_ID', 'Notes']
     
     try:
-        worksheet = spreadsheet.worksheet('PriceHistory')
-        current_headers = worksheet.row_values(1)
+        worksheet = get_worksheet('PriceHistory')
+        current_headers = header_row(worksheet)
         
         if len(current_headers) < len(price_history_columns):
-            for i, col in enumerate(price_history_columns):
-                if i >= len(current_headers):
-                    worksheet.update_cell(1, i+1, col)
+            update_row_values(worksheet, 1, price_history_columns[len(current_headers):], len(current_headers) + 1)
+        ENSURED_SHEETS.add('PriceHistory')
         return True
         
     except gspread.exceptions.WorksheetNotFound:
-        worksheet = spreadsheet.add_worksheet(
+        worksheet = create_worksheet(
             title='PriceHistory',
             rows=10000,
             cols=len(price_history_columns)
         )
         worksheet.append_row(price_history_columns)
+        ENSURED_SHEETS.add('PriceHistory')
         return True
     except Exception:
         return False
 
-def record_price_history(item_name, price, trans_type, user_name, transaction_id="", quantity=1, unit=""):
-    """Record price in history for trend analysis."""
+def record_price_history(item_name, price, trans_type, user_name, transaction_id="", quantity=1, unit="", batch=None):
+    """Record price in history for trend analysis (added to `batch` when given, else queued for the next flush)."""
     if not ensure_price_history_sheet():
         return False
     
     try:
-        worksheet = spreadsheet.worksheet('PriceHistory')
+        worksheet = get_worksheet('PriceHistory')
         
         # Record the price
         row = [
@@ -629,7 +1469,12 @@ def record_price_history(item_name, price, trans_type, user_name, transaction_id
             f"Recorded via transaction {transaction_id}"
         ]
         
-        worksheet.append_row(row)
+        request = append_row_request(worksheet, row)
+        if batch is not None:
+            batch.append(request)
+        else:
+            # History is never read back in the same reply, so it can ride the next flush
+            queue_writes(['PriceHistory'], [request])
         return True
     except Exception:
         return False
@@ -640,31 +1485,37 @@ def get_price_history(item_name, days=30):
         return []
     
     try:
-        worksheet = spreadsheet.worksheet('PriceHistory')
-        all_rows = worksheet.get_all_values()
+        all_rows, keys = sheet_row_keys('PriceHistory')
         
         if len(all_rows) <= 1:
             return []
         
-        cutoff_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+        cutoff_ord = (datetime.now() - timedelta(days=days)).toordinal()
         history = []
         
-        for row in all_rows[1:]:
-            if row and len(row) >= 3 and row[0].strip().lower() == item_name.lower():
-                if row[1] >= cutoff_date:
-                    try:
-                        history.append({
-                            'date': row[1],
-                            'price': float(row[2]),
-                            'type': row[3] if len(row) > 3 else '',
-                            'quantity': float(row[4]) if len(row) > 4 and row[4] else 1,
-                            'unit': row[5] if len(row) > 5 else ''
-                        })
-                    except (ValueError, IndexError):
-                        continue
-        
-        # Sort by date
-        history.sort(key=lambda x: x['date'])
+        target = item_name.lower()
+        
+        for key, row in zip(keys, all_rows[1:]):
+            # Cheap name check first; only matching rows get their date parsed
+            if key != target or len(row) < 3:
+                continue
+            day = parse_day(row[1].strip())
+            if day is None or day.toordinal() < cutoff_ord:
+                continue
+            try:
+                history.append({
+                    'date': row[1],
+                    'date_ord': day.toordinal(),
+                    'price': float(row[2]),
+                    'type': row[3] if len(row) > 3 else '',
+                    'quantity': float(row[4]) if len(row) > 4 and row[4] else 1,
+                    'unit': row[5] if len(row) > 5 else ''
+                })
+            except (ValueError, IndexError):
+                continue
+        
+        # Sort by day number
+        history.sort(key=operator.itemgetter('date_ord'))
         return history
         
     except Exception:
@@ -677,15 +1528,8 @@ def analyze_price_trends(item_name):
     if len(history) < 2:
         return None
     
-    # Calculate statistics
-    prices = [h['price'] for h in history]
-    quantities = [h['quantity'] for h in history]
-    
-    # Adjust for quantity (get unit prices)
-    unit_prices = []
-    for i, price in enumerate(prices):
-        if quantities[i] > 0:
-            unit_prices.append(price / quantities[i])
+    # Adjust for quantity (get unit prices) in one pass
+    unit_prices = [h['price'] / h['quantity'] for h in history if h['quantity'] > 0]
     
     if not unit_prices:
         return None
@@ -717,61 +1561,104 @@ def analyze_price_trends(item_name):
 # ==================== BUDGET MANAGEMENT ====================
 def ensure_budgets_sheet():
     """Ensure Budgets sheet exists."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return False
+    if 'Budgets' in ENSURED_SHEETS:
+        return True
     
     budget_columns = ['Category_Item', 'Type', 'Budget_Amount', 'Period', 
                      'Current_Spent', 'Remaining', 'Start_Date', 'End_Date',
                      'User', 'Alert_At', 'Status', 'Notes']
     
     try:
-        worksheet = spreadsheet.worksheet('Budgets')
-        current_headers = worksheet.row_values(1)
+        worksheet = get_worksheet('Budgets')
+        current_headers = header_row(worksheet)
         
         if len(current_headers) < len(budget_columns):
-            for i, col in enumerate(budget_columns):
-                if i >= len(current_headers):
-                    worksheet.update_cell(1, i+1, col)
+            update_row_values(worksheet, 1, budget_columns[len(current_headers):], len(current_headers) + 1)
+        ENSURED_SHEETS.add('Budgets')
         return True
         
     except gspread.exceptions.WorksheetNotFound:
-        worksheet = spreadsheet.add_worksheet(
+        worksheet = create_worksheet(
             title='Budgets',
             rows=1000,
             cols=len(budget_columns)
         )
         worksheet.append_row(budget_columns)
+        ENSURED_SHEETS.add('Budgets')
         return True
     except Exception:
         return False
 
+def load_budgets(force=False):
+    """Return all Budgets rows (header first), served from BUDGETS_CACHE while fresh."""
+    cache = BUDGETS_CACHE
+    now = time.time()
+    if not force and cache['rows'] is not None and now - cache['timestamp'] < BUDGETS_TTL:
+        return cache['rows']
+    
+    # Queued spending updates must land before the sheet is re-read
+    flush_before_read('Budgets')
+    return store_budgets(get_worksheet('Budgets').get_all_values(), now)
+
+def store_budgets(rows, now):
+    """Refill BUDGETS_CACHE from freshly read rows (header first)."""
+    cache = BUDGETS_CACHE
+    rows = pad_rows_to(rows, BUDGETS_WIDTH)
+    cache['rows'] = rows
+    cache['index'] = None
+    cache['by_user'] = None
+    cache['timestamp'] = now
+    return rows
+
+def budget_rows(category_item, user_name):
+    """1-based Budgets rows for (category/item, user) in sheet order, via an index built once per cache fill."""
+    rows = load_budgets()
+    index = BUDGETS_CACHE['index']
+    if index is None:
+        index = {}
+        for i, row in enumerate(rows[1:], start=2):
+            index.setdefault((row[8].strip(), row[0].strip().lower()), []).append(i)
+        BUDGETS_CACHE['index'] = index
+    return index.get((user_name, category_item.strip().lower()), [])
+
+def budget_row_index(category_item, user_name):
+    """First Budgets row for (category/item, user), like a top-down scan (None if absent)."""
+    matches = budget_rows(category_item, user_name)
+    return matches[0] if matches else None
+
+def invalidate_budgets():
+    """Drop the Budgets cache so the next read reloads from Sheets."""
+    BUDGETS_CACHE['rows'] = None
+    BUDGETS_CACHE['index'] = None
+    BUDGETS_CACHE['by_user'] = None
+
 def set_budget(category_item, budget_amount, period, user_name, alert_at=80):
     """Set a budget for a category or item."""
     if not ensure_budgets_sheet():
         return "❌ Cannot access Budgets sheet."
     
     try:
-        worksheet = spreadsheet.worksheet('Budgets')
-        all_rows = worksheet.get_all_values()
+        worksheet = get_worksheet('Budgets')
+        # Writes go by row number, so read the live sheet
+        load_budgets(force=True)
         
         # Check if budget already exists
-        row_index = None
-        for i, row in enumerate(all_rows[1:], start=2):
-            if row and len(row) > 0 and row[0].strip().lower() == category_item.lower() and row[8].strip() == user_name:
-                row_index = i
-                break
+        row_index = budget_row_index(category_item, user_name)
         
         # Determine type (category or item)
         budget_type = "category" if category_item.startswith("#") else "item"
         
-        # Calculate dates based on period
-        start_date = datetime.now().strftime('%Y-%m-%d')
+        # Calculate dates based on period (one clock read for both ends)
+        now = datetime.now()
+        start_date = now.strftime('%Y-%m-%d')
         if period == 'daily':
-            end_date = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+            end_date = (now + timedelta(days=1)).strftime('%Y-%m-%d')
         elif period == 'weekly':
-            end_date = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
+            end_date = (now + timedelta(days=7)).strftime('%Y-%m-%d')
         elif period == 'monthly':
-            end_date = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+            end_date = (now + timedelta(days=30)).strftime('%Y-%m-%d')
         else:
             return "❌ Invalid period. Use: daily, weekly, monthly"
         
@@ -792,48 +1679,58 @@ def set_budget(category_item, budget_amount, period, user_name, alert_at=80):
         
         if row_index:
             # Update existing budget
-            for col, value in enumerate(budget_data, start=1):
-                worksheet.update_cell(row_index, col, value)
+            update_row_values(worksheet, row_index, budget_data)
             action = "updated"
         else:
             # Add new budget
-            worksheet.append_row(budget_data)
+            append_values('Budgets', [budget_data])
             action = "set"
+        invalidate_budgets()
         
         return f"✅ {action.capitalize()} budget for {category_item}: {format_cedi(budget_amount)} {period}"
         
     except Exception as e:
         return f"❌ Failed to set budget: {str(e)}"
 
-def update_budget_spending(category_item, amount, user_name):
-    """Update budget spending when transaction is recorded."""
+def update_budget_spending(category_item, amount, user_name, batch=None, live=False):
+    """Update budget spending when transaction is recorded (queued on `batch` when given).
+    
+    `live` means the caller has just read Budgets from the sheet, so the cache can be used as-is.
+    """
     if not ensure_budgets_sheet():
         return None
     
     try:
-        worksheet = spreadsheet.worksheet('Budgets')
-        all_rows = worksheet.get_all_values()
+        worksheet = get_worksheet('Budgets')
+        # Read live: Current_Spent is written back as an absolute value by row number,
+        # so a cached row could overwrite another instance's (or a hand) update
+        all_rows = load_budgets(force=not live)
         
         # Find active budgets for this category/item and user
-        for i, row in enumerate(all_rows[1:], start=2):
-            if (row and len(row) > 8 and 
-                row[0].strip().lower() == category_item.lower() and 
-                row[8].strip() == user_name and
-                row[10].strip().lower() == 'active'):
+        for i in budget_rows(category_item, user_name):
+            row = all_rows[i - 1]
+            if row[10].strip().lower() == 'active':
                 
                 try:
-                    current_spent = float(row[4]) if len(row) > 4 and row[4] else 0
-                    budget_amount = float(row[2]) if len(row) > 2 and row[2] else 0
+                    current_spent = float(row[4]) if row[4] else 0
+                    budget_amount = float(row[2]) if row[2] else 0
                     
                     new_spent = current_spent + float(amount)
                     remaining = budget_amount - new_spent
                     
                     # Update spent and remaining
-                    worksheet.update_cell(i, 5, new_spent)  # Current_Spent
-                    worksheet.update_cell(i, 6, remaining)  # Remaining
+                    if batch is not None:
+                        batch.append(update_row_request(worksheet, i, 5, [new_spent, remaining]))
+                    else:
+                        update_row_values(worksheet, i, [new_spent, remaining], 5)  # Current_Spent, Remaining
+                    
+                    # Keep the cached row in step so the next transaction adds to it
+                    row[4] = str(new_spent)
+                    row[5] = str(remaining)
+                    BUDGETS_CACHE['by_user'] = None
                     
                     # Check if alert threshold reached
-                    alert_at = int(row[9]) if len(row) > 9 and row[9] else 80
+                    alert_at = int(row[9]) if row[9] else 80
                     percent_spent = (new_spent / budget_amount * 100) if budget_amount > 0 else 0
                     
                     if percent_spent >= alert_at:
@@ -860,43 +1757,133 @@ def check_budget_alerts(user_name):
         return []
     
     try:
-        worksheet = spreadsheet.worksheet('Budgets')
-        all_rows = worksheet.get_all_values()
-        
         alerts = []
-        
-        for row in all_rows[1:]:
-            if (row and len(row) > 10 and 
-                row[8].strip() == user_name and
-                row[10].strip().lower() == 'active'):
-                
-                try:
-                    category_item = row[0]
-                    budget_amount = float(row[2])
-                    current_spent = float(row[4]) if len(row) > 4 and row[4] else 0
-                    alert_at = int(row[9]) if len(row) > 9 and row[9] else 80
-                    
-                    if budget_amount > 0:
-                        percent_spent = (current_spent / budget_amount) * 100
-                        
-                        if percent_spent >= alert_at:
-                            alerts.append({
-                                'category_item': category_item,
-                                'budget': budget_amount,
-                                'spent': current_spent,
-                                'remaining': budget_amount - current_spent,
-                                'percent_spent': percent_spent,
-                                'alert_at': alert_at
-                            })
-                            
-                except (ValueError, IndexError):
-                    continue
+        for budget in active_user_budgets(user_name):
+            if budget['budget'] > 0 and budget['percent'] >= budget['alert_at']:
+                alerts.append({
+                    'category_item': budget['item'],
+                    'budget': budget['budget'],
+                    'spent': budget['spent'],
+                    'remaining': budget['budget'] - budget['spent'],
+                    'percent_spent': budget['percent'],
+                    'alert_at': budget['alert_at']
+                })
         
         return alerts
         
     except Exception:
         return []
 
+def budgets_by_user():
+    """Active Budgets rows parsed into dicts and grouped by user, once per cache fill (bad rows skipped)."""
+    rows = load_budgets()
+    by_user = BUDGETS_CACHE['by_user']
+    if by_user is not None:
+        return by_user
+    
+    by_user = {}
+    for row in rows[1:]:
+        try:
+            budget_amount = float(row[2]) if row[2] else 0
+            current_spent = float(row[4]) if row[4] else 0
+            remaining = float(row[5]) if row[5] else budget_amount - current_spent
+        except ValueError:
+            continue
+        
+        if row[10].strip().lower() != 'active':
+            continue
+        
+        alert_at = row[9].strip()
+        by_user.setdefault(row[8].strip(), []).append({
+            'item': row[0],
+            'budget': budget_amount,
+            'period': row[3],
+            'spent': current_spent,
+            'remaining': remaining,
+            'percent': (current_spent / budget_amount * 100) if budget_amount > 0 else 0,
+            'alert_at': int(alert_at) if alert_at.isdigit() else 80
+        })
+    
+    BUDGETS_CACHE['by_user'] = by_user
+    return by_user
+
+def active_user_budgets(user_name):
+    """A user's active budgets, without walking other users' rows."""
+    return budgets_by_user().get(user_name, [])
+
+def format_budget_lines(budgets):
+    """Budget list lines for the budgets views."""
+    parts = []
+    for budget in budgets:
+        percent_spent = budget['percent']
+        emoji = "❌" if percent_spent >= 100 else "⚠️" if percent_spent >= 90 else "📊" if percent_spent >= 50 else "✅"
+        parts.append(f"{emoji} **{budget['item']}**: {format_cedi(budget['spent'])} / {format_cedi(budget['budget'])} {budget['period']}\n")
+        parts.append(f"   Remaining: {format_cedi(budget['remaining'])} | {percent_spent:.1f}% spent\n\n")
+    return ''.join(parts)
+
+# ==================== SHEET PREFETCH ====================
+def sheet_is_stale(sheet_name, now):
+    """Whether the cache behind a sheet (PriceRanges, Budgets or SHEET_ROWS_CACHE) needs a read."""
+    if sheet_name == 'PriceRanges':
+        cache, ttl = PRICE_RANGES_CACHE, PRICE_RANGES_TTL
+    elif sheet_name == 'Budgets':
+        cache, ttl = BUDGETS_CACHE, BUDGETS_TTL
+    else:
+        cache, ttl = SHEET_ROWS_CACHE.get(sheet_name), SHEET_ROWS_TTL
+    return not cache or cache['rows'] is None or now - cache['timestamp'] >= ttl
+
+def prefetch_sheets(sheet_names, live=()):
+    """Fill the caches of every stale sheet in `sheet_names` with one values_batch_get.
+    
+    Sheets in `live` are read however fresh their cache is. With fewer than
+    two sheets to read, or if the call fails, nothing is done and each sheet
+    is read on its own when first used. Returns the names that were read.
+    """
+    now = time.time()
+    stale = [name for name in sheet_names if name in live or sheet_is_stale(name, now)]
+    if len(stale) < 2 or not get_spreadsheet():
+        return ()
+    
+    # Queued rows must reach Sheets before these are re-read
+    for name in stale:
+        flush_before_read(name)
+    
+    try:
+        value_ranges = spreadsheet.values_batch_get([sheet_rows_range(name) for name in stale]).get('valueRanges', [])
+    except Exception:
+        return ()
+    
+    for name, value_range in zip(stale, value_ranges):
+        rows = pad_rows(value_range.get('values', []))
+        if name == 'PriceRanges':
+            store_price_ranges(rows, now)
+        elif name == 'Budgets':
+            store_budgets(rows, now)
+        else:
+            SHEET_ROWS_CACHE[name] = {'rows': rows, 'timestamp': now}
+    return stale
+
+def prefetch_in_background(sheet_names):
+    """Fill the caches of stale `sheet_names` on a background thread, so the read overlaps the user's next message."""
+    now = time.time()
+    names = [name for name in sheet_names if name not in PREFETCHING and sheet_is_stale(name, now)]
+    if not names:
+        return
+    PREFETCHING.update(names)
+    
+    def run():
+        try:
+            prefetch_sheets(names)
+            for name in names:
+                if name not in ('PriceRanges', 'Budgets') and sheet_is_stale(name, time.time()):
+                    sheet_rows(name)
+        except Exception as e:
+            print(f"❌ Background prefetch of {names} failed: {e}")
+        finally:
+            PREFETCHING.difference_update(names)
+    
+    threading.Thread(target=run, daemon=True).start()
+
 # ==================== FIXED TRAIN COMMAND PARSER ====================
 def parse_train_command(text):
     """Parse +train command with proper handling of quotes and units."""
@@ -940,14 +1927,10 @@ def parse_train_command(text):
     unit_parts = []
     
     for part in parts:
-        # Try to parse as float
-        try:
-            num = float(part)
-            if len(numbers) < 2:
-                numbers.append(num)
-            else:
-                unit_parts.append(part)
-        except ValueError:
+        # Plain decimal numbers only, classified without raising for every word
+        if len(numbers) < 2 and NUMBER_TOKEN_RE.fullmatch(part):
+            numbers.append(float(part))
+        else:
             unit_parts.append(part)
     
     if len(numbers) < 2:
@@ -988,6 +1971,12 @@ def initialize_spreadsheet_connection():
         
         spreadsheet = client.open_by_key(SHEET_ID)
         
+        # Prewarm worksheet handles (Sales, Expenses, Income, PriceRanges, ...)
+        load_worksheet_handles()
+        
+        # All header rows in one read, instead of one row_values call per check below
+        prefetch_headers()
+        
         # Ensure all sheets have proper structure
         ensure_sheet_structures()
         
@@ -1000,34 +1989,111 @@ def initialize_spreadsheet_connection():
         # Initialize budgets sheet
         ensure_budgets_sheet()
         
+        # An existing Orders sheet is checked now, while its header is in hand;
+        # a missing one is only created when an order is first placed
+        if 'Orders' in WORKSHEET_CACHE:
+            ensure_orders_sheet()
+        HEADER_ROWS.clear()
+        
     except Exception as e:
         print(f"Connection failed: {e}")
         spreadsheet = None
 
+def get_spreadsheet():
+    """The spreadsheet, connecting on first use so import and sheet-free commands skip the auth round trip."""
+    global _connection_attempted
+    if not _connection_ready.is_set():
+        with CONNECTION_LOCK:
+            if not _connection_attempted:
+                # Set first: the structure checks run during setup call back in here
+                _connection_attempted = True
+                try:
+                    initialize_spreadsheet_connection()
+                finally:
+                    _connection_ready.set()
+    return spreadsheet
+
+def warm_connection():
+    """Start connecting on a background thread, so setup overlaps the first request instead of blocking it."""
+    if os.environ.get('GOOGLE_SHEET_ID') and not _connection_attempted:
+        threading.Thread(target=get_spreadsheet, daemon=True).start()
+
+def refresh_schema():
+    """Forget which sheets were checked and re-run the header checks."""
+    if not get_spreadsheet():
+        return "❌ Bot error: Not connected to database."
+    
+    ENSURED_SHEETS.clear()
+    invalidate_transactions()
+    load_worksheet_handles()
+    prefetch_headers()
+    ensure_sheet_structures()
+    results = {
+        'PriceRanges': ensure_price_ranges_sheet(),
+        'PriceHistory': ensure_price_history_sheet(),
+        'Budgets': ensure_budgets_sheet(),
+        'Orders': ensure_orders_sheet(),
+        'Goals': ensure_goals_sheet(),
+        'Recurring': ensure_recurring_sheet()
+    }
+    HEADER_ROWS.clear()
+    
+    failed = [name for name, ok in results.items() if not ok]
+    if failed:
+        return f"⚠️ Schema refreshed, but could not check: {', '.join(failed)}"
+    return "✅ Schema refreshed. All sheet headers checked."
+
 def ensure_sheet_structures():
     """Ensure all sheets have ID column and proper structure."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return
     
     # Define standard column order
     transaction_columns = ['ID', 'Date', 'Type', 'Amount', 'Description', 'Category', 'User', 'Timestamp']
     deleted_columns = ['ID', 'Date', 'Type', 'Amount', 'Description', 'Category', 'User', 'Original_Sheet', 'Deleted_Timestamp', 'Reason']
     
+    # Missing columns across all sheets are queued and inserted in one request
+    requests = []
+    changed = []
+    
     # Update transaction sheets
     for sheet_name in ['Sales', 'Expenses', 'Income']:
-        ensure_sheet_structure(sheet_name, transaction_columns)
+        if ensure_sheet_structure(sheet_name, transaction_columns, requests=requests):
+            changed.append(sheet_name)
     
     # Update DeletedTransactions sheet
-    ensure_sheet_structure('DeletedTransactions', deleted_columns, create_if_missing=True)
+    ensure_sheet_structure('DeletedTransactions', deleted_columns, create_if_missing=True, requests=requests)
+    
+    if requests:
+        spreadsheet.batch_update({'requests': requests})
+        for sheet_name in changed:
+            invalidate_transactions(sheet_name)
+
+def insert_column_requests(worksheet, index, header):
+    """batch_update requests that insert a column at 0-based `index` and set its header."""
+    return [
+        {
+            'insertDimension': {
+                'range': {
+                    'sheetId': worksheet.id,
+                    'dimension': 'COLUMNS',
+                    'startIndex': index,
+                    'endIndex': index + 1
+                },
+                'inheritFromBefore': False
+            }
+        },
+        update_row_request(worksheet, 1, index + 1, [header])
+    ]
 
-def ensure_sheet_structure(sheet_name, expected_columns, create_if_missing=False):
-    """Ensure a sheet has the expected column structure."""
+def ensure_sheet_structure(sheet_name, expected_columns, create_if_missing=False, requests=None):
+    """Ensure a sheet has the expected column structure (queued on `requests` when given)."""
     try:
-        worksheet = spreadsheet.worksheet(sheet_name)
+        worksheet = get_worksheet(sheet_name)
     except gspread.exceptions.WorksheetNotFound:
         if create_if_missing:
             # Create the sheet with expected columns
-            worksheet = spreadsheet.add_worksheet(
+            worksheet = create_worksheet(
                 title=sheet_name,
                 rows=1000,
                 cols=len(expected_columns)
@@ -1038,31 +2104,39 @@ def ensure_sheet_structure(sheet_name, expected_columns, create_if_missing=False
         else:
             return False
     
-    # Get current headers
-    current_headers = worksheet.row_values(1)
-    current_headers_lower = [h.strip().lower() for h in current_headers]
+    # Get current headers (lowercased once; reuse the ledger cache's when it has them)
+    cached = ROWS_CACHE.get(sheet_name)
+    if cached:
+        current_headers_lower = cached['columns']
+    else:
+        current_headers_lower = header_index(header_row(worksheet))
     
-    # Check if we need to add missing columns
-    needs_update = False
+    # Check if we need to add missing columns (applied in order, so indices line up)
+    column_requests = []
     for i, expected_col in enumerate(expected_columns):
         expected_col_lower = expected_col.lower()
         if expected_col_lower not in current_headers_lower:
-            # Insert missing column
-            worksheet.insert_cols([[expected_col]], i + 1)
+            column_requests.extend(insert_column_requests(worksheet, i, expected_col))
             print(f"Added {expected_col} column to {sheet_name}")
-            needs_update = True
     
-    return needs_update
-
-# Initialize connection
-initialize_spreadsheet_connection()
+    if not column_requests:
+        return False
+    
+    if requests is not None:
+        requests.extend(column_requests)
+    else:
+        spreadsheet.batch_update({'requests': column_requests})
+        invalidate_transactions(sheet_name)
+    return True
 
 # ==================== ORDER TRACKING SYSTEM ====================
 
 def ensure_orders_sheet():
     """Ensure Orders sheet exists with proper structure."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return False
+    if 'Orders' in ENSURED_SHEETS:
+        return True
     
     order_columns = [
         'Order ID', 'Date Created', 'Client Name', 'Client Contact', 
@@ -1071,24 +2145,24 @@ def ensure_orders_sheet():
     ]
     
     try:
-        worksheet = spreadsheet.worksheet('Orders')
-        current_headers = worksheet.row_values(1)
+        worksheet = get_worksheet('Orders')
+        current_headers = header_row(worksheet)
         
         # Check if all columns exist
         if len(current_headers) < len(order_columns):
-            for i, col in enumerate(order_columns):
-                if i >= len(current_headers):
-                    worksheet.update_cell(1, i+1, col)
+            update_row_values(worksheet, 1, order_columns[len(current_headers):], len(current_headers) + 1)
+        ENSURED_SHEETS.add('Orders')
         return True
         
     except gspread.exceptions.WorksheetNotFound:
         # Create new sheet
-        worksheet = spreadsheet.add_worksheet(
+        worksheet = create_worksheet(
             title='Orders',
             rows=1000,
             cols=len(order_columns)
         )
         worksheet.append_row(order_columns)
+        ENSURED_SHEETS.add('Orders')
         return True
     except Exception:
         return False
@@ -1099,7 +2173,6 @@ def record_order(amount, description, user_name, linked_sale_id="", client_name=
         return "❌ Cannot access Orders sheet."
     
     try:
-        worksheet = spreadsheet.worksheet('Orders')
         order_id = generate_transaction_id('ORD')
         
         # Payment status: If from a sale, it's 'Paid'
@@ -1122,7 +2195,7 @@ def record_order(amount, description, user_name, linked_sale_id="", client_name=
             linked_sale_id
         ]
         
-        worksheet.append_row(row)
+        append_values('Orders', [row])
         
         response = f"📦 **ORDER CREATED: {order_id}**\n\n"
         response += f"Services: {description}\n"
@@ -1137,43 +2210,72 @@ def record_order(amount, description, user_name, linked_sale_id="", client_name=
                 'expires': time.time() + 600
             }
             response += "\n\n🤔 **Who is this for?**\nPlease enter: `Name, Number`"
+            # The reply updates this order by row number; have the rows ready by then
+            prefetch_in_background(['Orders'])
         
         return response
         
     except Exception as e:
         return f"❌ Failed to record order: {str(e)}"
 
+def order_ids():
+    """Map uppercased order ID -> 1-based Orders row (first occurrence), built once per cache fill."""
+    rows = sheet_rows('Orders')
+    cached = SHEET_ROWS_CACHE['Orders']
+    if 'ids' not in cached:
+        ids = {}
+        for i, row in enumerate(rows[1:], start=2):
+            if row:
+                ids.setdefault(row[0].strip().upper(), i)
+        cached['ids'] = ids
+    return cached['ids']
+
+def order_row_index(worksheet, order_id):
+    """1-based Orders row of an order to write to (-1 if absent).
+    
+    A row number from cached rows is confirmed against the live row first;
+    when it no longer matches, the sheet is re-read.
+    """
+    target = order_id.strip().upper()
+    live = sheet_is_stale('Orders', time.time())
+    row_idx = order_ids().get(target)
+    if live:
+        return row_idx or -1
+    if row_idx:
+        row = worksheet.row_values(row_idx)
+        if row and row[0].strip().upper() == target:
+            return row_idx
+    invalidate_sheet_rows('Orders')
+    return order_ids().get(target, -1)
+
 def update_order_status(order_id, status=None, payment_status=None, user_name="User"):
     """Update order status or payment status."""
     if not ensure_orders_sheet():
         return "❌ Cannot access Orders sheet."
     
     try:
-        worksheet = spreadsheet.worksheet('Orders')
-        all_rows = worksheet.get_all_values()
-        
-        order_row_idx = -1
-        order_id_clean = order_id.strip().upper()
-        
-        for i, row in enumerate(all_rows[1:], start=2):
-            if row and row[0].strip().upper() == order_id_clean:
-                order_row_idx = i
-                break
+        worksheet = get_worksheet('Orders')
+        order_row_idx = order_row_index(worksheet, order_id)
         
         if order_row_idx == -1:
             return f"❌ Order {order_id} not found."
         
         updates = []
+        cells = []
         if status:
-            worksheet.update_cell(order_row_idx, 7, status)
+            cells.append({'range': f"G{order_row_idx}", 'values': [[status]]})
             updates.append(f"Status ➡️ {status}")
             # If delivered, record delivery info/date in column 9
             if status.lower() == "delivered":
-                worksheet.update_cell(order_row_idx, 9, f"Delivered on {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+                cells.append({'range': f"I{order_row_idx}", 'values': [[f"Delivered on {datetime.now().strftime('%Y-%m-%d %H:%M')}"]]})
         
         if payment_status:
-            worksheet.update_cell(order_row_idx, 8, payment_status)
+            cells.append({'range': f"H{order_row_idx}", 'values': [[payment_status]]})
             updates.append(f"Payment ➡️ {payment_status}")
+        
+        if cells:
+            worksheet.batch_update(cells, value_input_option='USER_ENTERED')
+            invalidate_sheet_rows('Orders')
             
         return f"✅ **Order {order_id} Updated!**\n" + "\n".join(updates)
         
@@ -1186,33 +2288,31 @@ def get_orders(limit=10, pending_only=False):
         return "❌ Cannot access Orders sheet."
     
     try:
-        worksheet = spreadsheet.worksheet('Orders')
-        all_rows = worksheet.get_all_values()
+        all_rows = sheet_rows('Orders')
         
         if len(all_rows) <= 1:
             return "📭 No orders found."
         
-        headers = all_rows[0]
+        # Newest first: walk up from the bottom and stop once `limit` orders are found
         orders = []
-        
-        for row in all_rows[1:]:
+        for i in range(len(all_rows) - 1, 0, -1):
+            row = all_rows[i]
             if not row: continue
             
             status = row[6] if len(row) > 6 else ""
-            if pending_only and status.lower() in ["delivered", "cancelled"]:
+            if pending_only and status.lower() in CLOSED_ORDER_STATUSES:
                 continue
                 
             orders.append(row)
+            if len(orders) == limit:
+                break
             
         if not orders:
             return "📭 No active orders found."
-            
-        # Sort by date (descending)
-        orders.reverse()
         
-        response = "📦 **RECENT ORDERS:**\n\n" if not pending_only else "⏳ **PENDING ORDERS:**\n\n"
+        parts = ["📦 **RECENT ORDERS:**\n\n" if not pending_only else "⏳ **PENDING ORDERS:**\n\n"]
         
-        for row in orders[:limit]:
+        for row in orders:
             oid = row[0]
             client = row[2] if row[2] else "Unknown"
             service = row[4]
@@ -1220,11 +2320,11 @@ def get_orders(limit=10, pending_only=False):
             status = row[6]
             pay = row[7]
             
-            response += f"• `{oid}` | {client}\n"
-            response += f"  {service} | {format_cedi(amount)}\n"
-            response += f"  Status: **{status}** | {pay}\n\n"
+            parts.append(f"• `{oid}` | {client}\n")
+            parts.append(f"  {service} | {format_cedi(amount)}\n")
+            parts.append(f"  Status: **{status}** | {pay}\n\n")
             
-        return response
+        return ''.join(parts)
         
     except Exception as e:
         return f"❌ Error fetching orders: {str(e)}"
@@ -1235,8 +2335,7 @@ def search_orders(query):
         return "❌ Cannot access Orders sheet."
     
     try:
-        worksheet = spreadsheet.worksheet('Orders')
-        all_rows = worksheet.get_all_values()
+        all_rows = sheet_rows('Orders')
         query = query.lower().strip()
         
         results = []
@@ -1246,17 +2345,19 @@ def search_orders(query):
             search_str = f"{row[0]} {row[2]} {row[4]}".lower()
             if query in search_str:
                 results.append(row)
+                if len(results) == 10:
+                    break  # Only the first 10 are shown
                 
         if not results:
             return f"🔍 No orders found matching '{query}'"
             
-        response = f"🔍 **SEARCH RESULTS: '{query}'**\n\n"
-        for row in results[:10]:
-            response += f"• `{row[0]}` | {row[2] or 'Unknown'}\n"
-            response += f"  {row[4]} | {format_cedi(row[5])}\n"
-            response += f"  Status: {row[6]} | {row[7]}\n\n"
+        parts = [f"🔍 **SEARCH RESULTS: '{query}'**\n\n"]
+        for row in results:
+            parts.append(f"• `{row[0]}` | {row[2] or 'Unknown'}\n")
+            parts.append(f"  {row[4]} | {format_cedi(row[5])}\n")
+            parts.append(f"  Status: {row[6]} | {row[7]}\n\n")
             
-        return response
+        return ''.join(parts)
     except Exception as e:
         return f"❌ Search failed: {str(e)}"
 
@@ -1271,24 +2372,18 @@ def handle_order_state(user_input, user_name):
     
     if state['action'] == 'waiting_for_client_info':
         # Split by comma or space
-        parts = [p.strip() for p in re.split(r'[,|]', user_input)]
+        parts = [p.strip() for p in ORDER_DETAILS_SPLIT_RE.split(user_input)]
         name = parts[0] if len(parts) > 0 else "Unknown"
         contact = parts[1] if len(parts) > 1 else ""
         
         try:
-            worksheet = spreadsheet.worksheet('Orders')
-            all_rows = worksheet.get_all_values()
-            row_idx = -1
-            for i, row in enumerate(all_rows[1:], start=2):
-                if row and row[0].strip().upper() == order_id.upper():
-                    row_idx = i
-                    break
+            worksheet = get_worksheet('Orders')
+            row_idx = order_row_index(worksheet, order_id)
             
             if row_idx != -1:
                 # Prevent '+' from being treated as a formula in Sheets
                 contact_safe = f"'{contact}" if contact.startswith('+') else contact
-                worksheet.update_cell(row_idx, 3, name)   # Client Name
-                worksheet.update_cell(row_idx, 4, contact_safe) # Client Contact
+                update_row_values(worksheet, row_idx, [name, contact_safe], 3)  # Client Name, Client Contact
                 
                 # Check for loyalty alert now that we have accurate info
                 profile = get_client_profile(contact if contact else name)
@@ -1311,21 +2406,16 @@ def get_order_reminders():
     if not ensure_orders_sheet(): return "❌ Cannot access Orders."
     
     try:
-        worksheet = spreadsheet.worksheet('Orders')
-        all_rows = worksheet.get_all_values()
+        all_rows = sheet_rows('Orders')
         if len(all_rows) <= 1: return "📭 No orders found."
         
-        pending = []
-        for row in all_rows[1:]:
-            if not row: continue
-            status = row[6].lower()
-            if status in ["pending", "in progress", "ready for delivery"]:
-                pending.append(row)
+        # Only the count is shown, so no list is built
+        pending = sum(1 for row in all_rows[1:] if row and row[6].lower() in OPEN_ORDER_STATUSES)
         
         if not pending:
             return "✅ All orders are delivered! No pending tasks."
             
-        response = f"🔔 **ORDER REMINDER: {len(pending)} PENDING**\n\n"
+        response = f"🔔 **ORDER REMINDER: {pending} PENDING**\n\n"
         return response
     except Exception as e:
         return f"❌ Reminder failed: {str(e)}"
@@ -1334,17 +2424,21 @@ def get_order_reminders():
 
 def ensure_goals_sheet():
     """Ensure Goals sheet exists with proper structure."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return False
+    if 'Goals' in ENSURED_SHEETS:
+        return True
     
     columns = ['Month', 'Year', 'Target Type', 'Target Amount', 'User', 'Status']
     
     try:
-        worksheet = spreadsheet.worksheet('Goals')
+        worksheet = get_worksheet('Goals')
+        ENSURED_SHEETS.add('Goals')
         return True
     except gspread.exceptions.WorksheetNotFound:
-        worksheet = spreadsheet.add_worksheet(title='Goals', rows=100, cols=len(columns))
+        worksheet = create_worksheet(title='Goals', rows=100, cols=len(columns))
         worksheet.append_row(columns)
+        ENSURED_SHEETS.add('Goals')
         return True
     except Exception:
         return False
@@ -1355,20 +2449,24 @@ def set_goal(amount, target_type="profit", user_name="User"):
         return "❌ Cannot access Goals sheet."
     
     try:
-        worksheet = spreadsheet.worksheet('Goals')
+        worksheet = get_worksheet('Goals')
         now = datetime.now()
         month = now.strftime('%B')
         year = now.strftime('%Y')
         
         # Deactivate previous goals for this month/type
-        all_rows = worksheet.get_all_values()
+        all_rows = sheet_rows('Goals', force=True)
+        target_lower = target_type.lower()
+        cells = []
         for i, row in enumerate(all_rows[1:], start=2):
             if (len(row) >= 6 and row[0] == month and row[1] == year and 
-                row[2].lower() == target_type.lower() and row[4] == user_name):
-                worksheet.update_cell(i, 6, 'Inactive')
+                row[2].lower() == target_lower and row[4] == user_name):
+                cells.append({'range': f"F{i}", 'values': [['Inactive']]})
+        if cells:
+            worksheet.batch_update(cells, value_input_option='USER_ENTERED')
         
         # Add new goal
-        worksheet.append_row([month, year, target_type, float(amount), user_name, 'Active'])
+        append_values('Goals', [[month, year, target_type, float(amount), user_name, 'Active']])
         
         return f"🎯 **Goal Set for {month}!**\nTarget: {format_cedi(amount)} {target_type}\nLet's get to work! 🚀"
     except Exception as e:
@@ -1380,17 +2478,17 @@ def get_goal_progress(target_type="profit", user_name="User"):
         return ""
     
     try:
-        worksheet = spreadsheet.worksheet('Goals')
-        all_rows = worksheet.get_all_values()
+        all_rows = sheet_rows('Goals')
         
         now = datetime.now()
         month = now.strftime('%B')
         year = now.strftime('%Y')
         
         active_goal = None
+        target_lower = target_type.lower()
         for row in all_rows[1:]:
             if (len(row) >= 6 and row[0] == month and row[1] == year and 
-                row[2].lower() == target_type.lower() and row[4] == user_name and 
+                row[2].lower() == target_lower and row[4] == user_name and 
                 row[5] == 'Active'):
                 active_goal = float(row[3])
                 break
@@ -1400,18 +2498,17 @@ def get_goal_progress(target_type="profit", user_name="User"):
         
         # Calculate current progress
         current_profit = 0.0
-        if target_type.lower() == "profit":
+        if target_lower == "profit":
             # Simple profit calculation for this month
             start_date = now.replace(day=1).strftime('%Y-%m-%d')
             end_date = now.strftime('%Y-%m-%d')
             
-            for sheet in ['Sales', 'Expenses', 'Income']:
-                trans = get_transactions(sheet, start_date=start_date, end_date=end_date)
-                for t in trans:
-                    if t['type'] in ['sale', 'income']:
-                        current_profit += t['amount']
-                    else:
-                        current_profit -= t['amount']
+            prefetch_ledgers()
+            for sheet in LEDGER_SHEETS:
+                try:
+                    current_profit += net_total_between(sheet, start_date, end_date)
+                except Exception:
+                    continue  # Unreadable sheet counts as empty, as get_transactions did
         
         percent = (current_profit / active_goal * 100) if active_goal > 0 else 0
         percent = max(0, percent) # Don't show negative progress
@@ -1437,17 +2534,21 @@ def get_goal_progress(target_type="profit", user_name="User"):
 
 def ensure_recurring_sheet():
     """Ensure Recurring sheet exists with proper structure."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return False
+    if 'Recurring' in ENSURED_SHEETS:
+        return True
     
     columns = ['Type', 'Amount', 'Description', 'Frequency', 'Last Recorded', 'User', 'Status']
     
     try:
-        spreadsheet.worksheet('Recurring')
+        get_worksheet('Recurring')
+        ENSURED_SHEETS.add('Recurring')
         return True
     except gspread.exceptions.WorksheetNotFound:
-        worksheet = spreadsheet.add_worksheet(title='Recurring', rows=100, cols=len(columns))
+        worksheet = create_worksheet(title='Recurring', rows=100, cols=len(columns))
         worksheet.append_row(columns)
+        ENSURED_SHEETS.add('Recurring')
         return True
     except Exception:
         return False
@@ -1458,13 +2559,11 @@ def add_recurring_transaction(trans_type, amount, description, frequency, user_n
         return "❌ Cannot access Recurring sheet."
     
     try:
-        worksheet = spreadsheet.worksheet('Recurring')
-        
         freq_lower = frequency.lower()
-        if freq_lower not in ['daily', 'weekly', 'monthly']:
+        if freq_lower not in PERIOD_NAMES:
             return "❌ Frequency must be 'daily', 'weekly', or 'monthly'."
             
-        worksheet.append_row([
+        append_values('Recurring', [[
             trans_type.lower(), 
             float(amount), 
             description, 
@@ -1472,7 +2571,7 @@ def add_recurring_transaction(trans_type, amount, description, frequency, user_n
             "Never", # Last Recorded
             user_name, 
             'Active'
-        ])
+        ]])
         
         return f"🔄 **Recurring {trans_type} added!**\nAmount: {format_cedi(amount)}\nFrequency: {frequency.title()}\nDescription: {description}"
     except Exception as e:
@@ -1480,15 +2579,18 @@ def add_recurring_transaction(trans_type, amount, description, frequency, user_n
 
 def check_recurring_due(user_name="User", auto_record=False):
     """Check for recurring items that are due for recording."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return "❌ Spreadsheet connection not initialized."
         
     try:
-        worksheet = spreadsheet.worksheet('Recurring')
-        all_rows = worksheet.get_all_values()
+        worksheet = get_worksheet('Recurring')
+        # Balance and report replies check this on every call; only recording writes back by row number
+        all_rows = sheet_rows('Recurring', force=auto_record)
         
         due_items = []
         today = datetime.now().date()
+        today_str = today.strftime('%Y-%m-%d')
+        week_ago = today - timedelta(days=7)
         
         for i, row in enumerate(all_rows[1:], start=2):
             if len(row) >= 7 and row[5] == user_name and row[6].lower() == 'active':
@@ -1503,10 +2605,10 @@ def check_recurring_due(user_name="User", auto_record=False):
                     due = True
                 else:
                     try:
-                        last_recorded = datetime.strptime(last_recorded_str, '%Y-%m-%d').date()
+                        last_recorded = parse_day(last_recorded_str).date()
                         if freq == 'daily' and today > last_recorded:
                             due = True
-                        elif freq == 'weekly' and today >= last_recorded + timedelta(days=7):
+                        elif freq == 'weekly' and last_recorded <= week_ago:
                             due = True
                         elif freq == 'monthly':
                             # check if it's been at least 28 days and the month is different
@@ -1530,18 +2632,21 @@ def check_recurring_due(user_name="User", auto_record=False):
             
         if auto_record:
             results = []
+            last_dates = []
             for item in due_items:
                 res = record_transaction(item['type'], item['amount'], item['desc'], user_name)
                 # Update last recorded date
-                worksheet.update_cell(item['row_idx'], 5, today.strftime('%Y-%m-%d'))
+                last_dates.append(update_row_request(worksheet, item['row_idx'], 5, [today_str]))
                 results.append(f"✅ Auto-recorded: {item['desc']}")
+            # Rides the same flush as the ledger rows queued above: one request for the whole run
+            queue_writes(['Recurring'], last_dates)
             return "\n".join(results)
         else:
-            msg = f"🔄 **{len(due_items)} Recurring Items Due:**\n"
+            parts = [f"🔄 **{len(due_items)} Recurring Items Due:**\n"]
             for item in due_items:
-                msg += f"• {item['desc']} ({format_cedi(item['amount'])})\n"
-            msg += "\n💡 Type `record due` to post them all now."
-            return msg
+                parts.append(f"• {item['desc']} ({format_cedi(item['amount'])})\n")
+            parts.append("\n💡 Type `record due` to post them all now.")
+            return ''.join(parts)
             
     except Exception as e:
         return f"❌ Check recurring failed: {str(e)}"
@@ -1552,20 +2657,19 @@ def get_category_averages(user_name="User", days=30):
     """Calculate average spending per category over the last X days."""
     try:
         start_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
-        expenses = get_transactions('Expenses', start_date=start_date, user_filter=user_name)
+        if not get_spreadsheet():
+            return {}
         
-        stats = {}
-        for e in expenses:
-            cat = e['category'] or 'Uncategorized'
-            if cat not in stats:
-                stats[cat] = []
-            stats[cat].append(e['amount'])
-            
-        averages = {}
-        for cat, amounts in stats.items():
-            averages[cat] = sum(amounts) / len(amounts)
+        # category -> [count, total], straight off the cached ledger window
+        stats = defaultdict(lambda: [0, 0.0])
+        for e in transactions_between('Expenses', start_date):
+            if e['user'] != user_name:
+                continue
+            entry = stats[e['category'] or 'Uncategorized']
+            entry[0] += 1
+            entry[1] += e['amount']
             
-        return averages
+        return {cat: total / count for cat, (count, total) in stats.items()}
     except Exception:
         return {}
 
@@ -1584,28 +2688,28 @@ def audit_expense(category, amount, user_name="User"):
 
 # ==================== SERVICE INSIGHTS SYSTEM ====================
 
+# Sales repeat the same few descriptions, and insights clean every one of them
+@functools.lru_cache(maxsize=2048)
 def clean_service_name(description):
     """Clean description to extract the core service name."""
     if not description:
         return "Unknown"
     
     # Remove numbers (prices, quantities)
-    clean = re.sub(r'\b\d+(\.\d+)?\b', '', description)
+    clean = NUMBER_WORD_RE.sub('', description)
     
     # Remove hashtags
-    clean = re.sub(r'#\w+', '', clean)
+    clean = HASHTAG_STRIP_RE.sub('', clean)
     
     # Remove filler words
-    filler_words = ['for', 'with', 'of', 'and', 'the', 'a', 'an']
-    words = clean.lower().split()
-    words = [w for w in words if w not in filler_words]
+    words = [w for w in clean.lower().split() if w not in SERVICE_FILLER_WORDS]
     
     clean = ' '.join(words).strip()
     return clean.title() if clean else "General Sale"
 
 def get_service_insights(limit=5):
     """Analyze sales by description and category for business insights."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return "❌ Spreadsheet connection not initialized."
     
     try:
@@ -1613,60 +2717,76 @@ def get_service_insights(limit=5):
         if not transactions:
             return "📭 No sales data found to analyze."
         
-        insights = {}
+        # service name -> [count, total]
+        insights = defaultdict(lambda: [0, 0.0])
         
         for t in transactions:
             desc = t['description']
             cat = t['category']
-            amount = t['amount']
             
             # Use category if exists, otherwise clean description
             service_name = f"#{cat}" if cat else clean_service_name(desc)
             
-            if service_name not in insights:
-                insights[service_name] = {'count': 0, 'total': 0.0}
-            
-            insights[service_name]['count'] += 1
-            insights[service_name]['total'] += amount
+            entry = insights[service_name]
+            entry[0] += 1
+            entry[1] += t['amount']
             
         if not insights:
             return "📭 Not enough data for insights."
             
-        # Sort by total value (descending)
-        sorted_insights = sorted(insights.items(), key=lambda x: x[1]['total'], reverse=True)
+        # Top `limit` by total value (descending); the rest only feed the totals
+        top_insights = heapq.nlargest(limit, insights.items(), key=lambda x: x[1][1])
         
-        response = "📊 **SERVICE INSIGHTS: TOP PERFORMERS**\n\n"
+        parts = ["📊 **SERVICE INSIGHTS: TOP PERFORMERS**\n\n"]
         
-        for name, data in sorted_insights[:limit]:
-            count = data['count']
-            total = data['total']
+        for name, (count, total) in top_insights:
             avg = total / count if count > 0 else 0
             
-            response += f"• **{name}**\n"
-            response += f"  Total: {format_cedi(total)} | Sold: {count} times\n"
-            response += f"  Average Price: {format_cedi(avg)}\n\n"
+            parts.append(f"• **{name}**\n")
+            parts.append(f"  Total: {format_cedi(total)} | Sold: {count} times\n")
+            parts.append(f"  Average Price: {format_cedi(avg)}\n\n")
             
         # Summary stats
-        total_rev = sum(d['total'] for n, d in sorted_insights)
-        total_qty = sum(d['count'] for n, d in sorted_insights)
+        total_rev = sum(d[1] for d in insights.values())
         
-        response += f"📈 **OVERALL PERFORMANCE**\n"
-        response += f"Total Revenue: {format_cedi(total_rev)}\n"
-        response += f"Service Diversity: {len(insights)} unique types\n"
+        parts.append(f"📈 **OVERALL PERFORMANCE**\n")
+        parts.append(f"Total Revenue: {format_cedi(total_rev)}\n")
+        parts.append(f"Service Diversity: {len(insights)} unique types\n")
         
-        return response
+        return ''.join(parts)
         
     except Exception as e:
         return f"❌ Analysis failed: {str(e)}"
 
 # ==================== PDF EXPORT & INVOICING SYSTEM ====================
 
-def get_logo_image(url):
-    """Download logo and return as ReportLab Image if possible."""
+def fetch_logo_bytes(url):
+    """Download the logo once per process; failures are not cached, so the next PDF retries."""
     try:
         response = requests.get(url, timeout=5)
         if response.status_code == 200:
-            img_data = io.BytesIO(response.content)
+            LOGO_CACHE[url] = response.content
+    except:
+        pass
+
+def prefetch_logo(url):
+    """Start downloading the logo in the background, so it overlaps the sheet reads."""
+    if url not in LOGO_CACHE and url not in LOGO_FETCHES:
+        thread = threading.Thread(target=fetch_logo_bytes, args=(url,), daemon=True)
+        LOGO_FETCHES[url] = thread
+        thread.start()
+
+def get_logo_image(url):
+    """Return the logo as a ReportLab Image if possible (a new flowable per document)."""
+    thread = LOGO_FETCHES.pop(url, None)
+    if thread is not None:
+        thread.join()
+    elif url not in LOGO_CACHE:
+        fetch_logo_bytes(url)
+    try:
+        logo_bytes = LOGO_CACHE.get(url)
+        if logo_bytes:
+            img_data = io.BytesIO(logo_bytes)
             img = Image(img_data)
             # Resize logo to fit nicely
             aspect = img.imageWidth / img.imageHeight
@@ -1679,19 +2799,21 @@ def get_logo_image(url):
 
 def generate_financial_report_pdf(period='month'):
     """Generate a PDF financial report for a given period."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return None, "❌ Not connected to database."
         
     try:
         start_date, end_date = get_date_range(period)
         all_trans = []
+        prefetch_logo(BUSINESS_PROFILE['logo_url'])
+        prefetch_ledgers()
         for sheet in ['Sales', 'Expenses', 'Income']:
             all_trans.extend(get_transactions(sheet, start_date=start_date, end_date=end_date))
         
         if not all_trans:
             return None, "📭 No transactions found for this period."
             
-        all_trans.sort(key=lambda x: x['date'])
+        all_trans.sort(key=operator.itemgetter('date'))
         
         buffer = io.BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=letter)
@@ -1710,28 +2832,28 @@ def generate_financial_report_pdf(period='month'):
         elements.append(Spacer(1, 0.2 * inch))
         
         # Table Data
-        data = [['Date', 'Type', 'Description', 'Category', 'Amount']]
+        header = ['Date', 'Type', 'Description', 'Category', 'Amount']
+        data = [None] * len(all_trans)
         total_income = 0
         total_expense = 0
         
-        for t in all_trans:
-            is_income = t['type'] in ['sale', 'income']
+        for i, t in enumerate(all_trans):
+            is_income = t['type'] in INCOME_TYPES
             amount = t['amount']
             if is_income: total_income += amount
             else: total_expense += amount
             
-            # Escape strings for Table (though Table handles them better, it's good practice)
-            data.append([
-                xml_escape(t['date']),
-                xml_escape(t['type'].upper()),
-                xml_escape(t['description'][:30]),
-                xml_escape(t['category'] or "-"),
+            # Plain strings: Table draws them as-is (only Paragraph text is markup and needs escaping)
+            data[i] = [
+                t['date'],
+                t['type'].upper(),
+                t['description'][:30],
+                t['category'] or "-",
                 format_cedi(amount)
-            ])
+            ]
             
         # Table Styling
-        t = Table(data, hAlign='LEFT')
-        t.setStyle(TableStyle([
+        table_style = TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
             ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
@@ -1739,8 +2861,12 @@ def generate_financial_report_pdf(period='month'):
             ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
             ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
             ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        elements.append(t)
+        ])
+        # One Table per chunk, each repeating the header if it breaks across pages
+        for start in range(0, len(data), REPORT_TABLE_CHUNK):
+            t = Table([header] + data[start:start + REPORT_TABLE_CHUNK], hAlign='LEFT', repeatRows=1)
+            t.setStyle(table_style)
+            elements.append(t)
         elements.append(Spacer(1, 0.3 * inch))
         
         # Summary
@@ -1761,13 +2887,13 @@ def generate_financial_report_pdf(period='month'):
 
 def generate_invoice_pdf(order_id):
     """Generate a professional PDF invoice for a specific order."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return None, "❌ Not connected to database."
         
     try:
         # Find the order
-        worksheet = spreadsheet.worksheet('Orders')
-        all_rows = worksheet.get_all_values()
+        prefetch_logo(BUSINESS_PROFILE['logo_url'])
+        all_rows = sheet_rows('Orders')
         order_row = None
         for row in all_rows[1:]:
             if len(row) > 0 and row[0] == order_id:
@@ -1856,7 +2982,7 @@ def generate_invoice_pdf(order_id):
 
 def get_client_profile(search_term):
     """Retrieve history and loyalty status for a client using smart matching (Phone or Name)."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return None
         
     try:
@@ -1866,8 +2992,7 @@ def get_client_profile(search_term):
         search_lower = search_term.lower()
         
         # Search in Orders first (better client data)
-        orders_ws = spreadsheet.worksheet('Orders')
-        all_orders = orders_ws.get_all_values()
+        all_orders = sheet_rows('Orders')
         
         client_data = {
             'name': "",
@@ -1909,8 +3034,8 @@ def get_client_profile(search_term):
                 try: 
                     # Date Created is row[1]
                     o_date_str = row[1].split()[0] # Get YYYY-MM-DD from YYYY-MM-DD HH:MM:SS
-                    o_date = datetime.strptime(o_date_str, '%Y-%m-%d')
-                    if not client_data['last_order'] or o_date > client_data['last_order']:
+                    o_date = parse_day(o_date_str)
+                    if o_date and (not client_data['last_order'] or o_date > client_data['last_order']):
                         client_data['last_order'] = o_date
                 except: pass
                 
@@ -1954,12 +3079,11 @@ def get_client_profile(search_term):
 
 def list_clients(top_loyal=False, limit=20):
     """List clients, either by loyalty rank or recent activity."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return "❌ Not connected to database."
         
     try:
-        orders_ws = spreadsheet.worksheet('Orders')
-        all_orders = orders_ws.get_all_values()
+        all_orders = sheet_rows('Orders')
         
         if not all_orders or len(all_orders) < 2:
             return "📭 No clients found yet."
@@ -1994,8 +3118,8 @@ def list_clients(top_loyal=False, limit=20):
             
             try:
                 o_date_str = row[1].split()[0]
-                o_date = datetime.strptime(o_date_str, '%Y-%m-%d')
-                if o_date > reg['last_date']:
+                o_date = parse_day(o_date_str)
+                if o_date and o_date > reg['last_date']:
                     reg['last_date'] = o_date
             except: pass
             
@@ -2007,29 +3131,27 @@ def list_clients(top_loyal=False, limit=20):
             else: c['tier'] = "🥉 Bronze"
             
         if top_loyal:
-            # Sort by orders, then spending
-            client_list.sort(key=lambda x: (x['orders'], x['spending']), reverse=True)
+            # Top 10 by orders, then spending
+            client_list = heapq.nlargest(10, client_list, key=lambda x: (x['orders'], x['spending']))
             title = "🏆 **TOP LOYAL CLIENTS**"
-            count = min(len(client_list), 10)
+            count = len(client_list)
         else:
-            # Sort by recency
-            client_list.sort(key=lambda x: x['last_date'], reverse=True)
+            # Most recent first
+            client_list = heapq.nlargest(limit, client_list, key=operator.itemgetter('last_date'))
             title = "👥 **RECENT CLIENTS**"
-            count = min(len(client_list), limit)
+            count = len(client_list)
             
         if not client_list:
             return "📭 No unique clients identified."
             
-        response = f"{title}\n"
-        response += "Rank | Client | Tier | Total\n"
-        response += "---|---|---|---\n"
+        parts = [f"{title}\n", "Rank | Client | Tier | Total\n", "---|---|---|---\n"]
         
         for i, c in enumerate(client_list[:count], 1):
             last_seen = c['last_date'].strftime('%b %d') if c['last_date'] != datetime.min else "-"
-            response += f"{i}. **{c['name']}** | {c['tier']} | {format_cedi(c['spending'])}\n"
-            response += f"   *Last: {last_seen} | Orders: {c['orders']}*\n\n"
+            parts.append(f"{i}. **{c['name']}** | {c['tier']} | {format_cedi(c['spending'])}\n")
+            parts.append(f"   *Last: {last_seen} | Orders: {c['orders']}*\n\n")
             
-        return response
+        return ''.join(parts)
         
     except Exception as e:
         return f"❌ Error retrieving client list: {str(e)}"
@@ -2037,15 +3159,17 @@ def list_clients(top_loyal=False, limit=20):
 # ==================== ENHANCED TRANSACTION FUNCTIONS (WITH ALL NEW FEATURES) ====================
 def record_transaction(trans_type, amount, description="", user_name="User"):
     """Record a transaction with interactive price checking and all new features."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return "❌ Bot error: Not connected to database."
     
-    sheet_name = TYPE_TO_SHEET.get(trans_type.lower())
+    # Normalize the type once; the original spelling is kept for the reply text
+    type_key = trans_type.lower()
+    sheet_name = TYPE_TO_SHEET.get(type_key)
     if not sheet_name:
         return f"❌ Unknown transaction type: '{trans_type}'."
     
     try:
-        worksheet = spreadsheet.worksheet(sheet_name)
+        worksheet = get_worksheet(sheet_name)
         
         # Generate unique ID
         transaction_id = generate_transaction_id(trans_type)
@@ -2054,11 +3178,14 @@ def record_transaction(trans_type, amount, description="", user_name="User"):
         category = ""
         clean_description = description
         
-        hashtags = re.findall(r'#(\w+)', description)
+        hashtags = HASHTAG_RE.findall(description)
         if hashtags:
             category = hashtags[0]
-            clean_description = re.sub(r'#\w+', '', description).strip()
-            clean_description = re.sub(r'\s+', ' ', clean_description)
+            clean_description = HASHTAG_STRIP_RE.sub('', description).strip()
+            clean_description = WHITESPACE_RE.sub(' ', clean_description)
+        
+        # The price checks read PriceRanges and the budget update needs Budgets read live; fetch them together
+        prefetched = prefetch_sheets(['PriceRanges', 'Budgets'], live=['Budgets']) if category else ()
         
         # Check for price warnings and create correction states
         correction_states = []
@@ -2066,23 +3193,18 @@ def record_transaction(trans_type, amount, description="", user_name="User"):
         # 1. Check if the exact item is trained
         detected_items = auto_detect_items_in_description(clean_description)
         
+        # Only items/categories with a trained range can raise a price alert
         for item in detected_items:
+            if not has_price_range(item['item']):
+                continue
             price_check = check_price(item['item'], amount)
             if price_check and price_check['status'] != 'within':
                 state_id = correction_state.add_correction(
                     user_name,  # Using username as user_id for simplicity
-                    transaction_id,
                     item['item'],
                     float(amount),
                     item['min'],
-                    item['max'],
-                    sheet_name,
-                    {
-                        'type': trans_type,
-                        'description': clean_description,
-                        'category': category,
-                        'user': user_name
-                    }
+                    item['max']
                 )
                 correction_states.append({
                     'state_id': state_id,
@@ -2094,23 +3216,15 @@ def record_transaction(trans_type, amount, description="", user_name="User"):
                 })
         
         # 2. Check category if present
-        if category:
+        if category and has_price_range(f"#{category}"):
             price_check = check_price(f"#{category}", amount)
             if price_check and price_check['status'] != 'within':
                 state_id = correction_state.add_correction(
                     user_name,
-                    transaction_id,
                     f"#{category}",
                     float(amount),
                     price_check['range']['min'],
-                    price_check['range']['max'],
-                    sheet_name,
-                    {
-                        'type': trans_type,
-                        'description': clean_description,
-                        'category': category,
-                        'user': user_name
-                    }
+                    price_check['range']['max']
                 )
                 correction_states.append({
                     'state_id': state_id,
@@ -2121,24 +3235,68 @@ def record_transaction(trans_type, amount, description="", user_name="User"):
                     'difference': price_check.get('difference', 0)
                 })
         
-        # Prepare row with ID
+        # Prepare row with ID (one clock read for both date and time)
+        now = datetime.now()
         row = [
             transaction_id,                           # ID
-            datetime.now().strftime('%Y-%m-%d'),     # Date
-            trans_type.lower(),                      # Type
+            now.strftime('%Y-%m-%d'),                # Date
+            type_key,                                # Type
             float(amount),                           # Amount
             clean_description,                       # Description
             category,                                # Category
             user_name,                               # User
-            datetime.now().strftime('%I:%M %p')      # Timestamp
+            now.strftime('%I:%M %p')                 # Timestamp
         ]
         
-        worksheet.append_row(row)
+        # Queue the ledger row, price history and budget updates, then write them in one request
+        writes = [append_row_request(worksheet, row)]
+        
+        # Record price history for detected items (or the category)
+        for item in detected_items:
+            quantity, unit = detect_quantity_and_unit(clean_description)
+            record_price_history(
+                item['item'],
+                amount,
+                trans_type,
+                user_name,
+                transaction_id,
+                quantity,
+                unit,
+                batch=writes
+            )
+        
+        # Category history only when no item was detected, otherwise it duplicates the item rows
+        if category and not detected_items:
+            record_price_history(
+                f"#{category}",
+                amount,
+                trans_type,
+                user_name,
+                transaction_id,
+                1,  # Categories don't have quantity
+                "",
+                batch=writes
+            )
+        
+        # Check budget alerts for category
+        budget_alert = None
+        if category:
+            budget_alert = update_budget_spending(f"#{category}", amount, user_name, batch=writes,
+                                                  live='Budgets' in prefetched)
+        
+        # Queued rather than sent: the reply doesn't wait on Sheets
+        queued_sheets = [sheet_name]
+        if detected_items or category:
+            queued_sheets.append('PriceHistory')
+        if category:
+            queued_sheets.append('Budgets')
+        queue_writes(queued_sheets, writes, check=(sheet_name, 0, transaction_id))
+        mark_transactions_appended(sheet_name)
         
         # Client Intelligence: Check for returning client on sales
         client_alert = ""
         # Only check if description strongly suggests a name or number (e.g. "@Kofi" or starts with digit)
-        if trans_type.lower() == 'sale' and clean_description:
+        if type_key == 'sale' and clean_description:
             words = clean_description.split()
             first_word = words[0] if words else ""
             
@@ -2152,131 +3310,109 @@ def record_transaction(trans_type, amount, description="", user_name="User"):
                     lines = profile.split('\n')
                     client_alert = f"\n💡 **Returning Client!**\n{lines[1]} | {lines[3]}"
 
-        # Prepare confirmation message
-        response = f"✅ Recorded {trans_type} of {format_cedi(amount)}"
+        # Prepare confirmation message (collected as parts, joined once at the end)
+        parts = [f"✅ Recorded {trans_type} of {format_cedi(amount)}"]
         if category:
-            response += f" in category: #{category}"
-        response += f"\n📝 **ID:** `{transaction_id}`"
+            parts.append(f" in category: #{category}")
+        parts.append(f"\n📝 **ID:** `{transaction_id}`")
         
         if client_alert:
-            response += client_alert
+            parts.append(client_alert)
             
         # Add unit price calculation if quantity detected
         unit_price_info = calculate_unit_price(amount, clean_description)
         if unit_price_info:
-            response += f"\n{unit_price_info}"
+            parts.append(f"\n{unit_price_info}")
         
         # Add interactive price warnings if any
         if correction_states:
-            response += "\n\n🤔 **PRICE CHECK ALERT:**\n"
+            parts.append("\n\n🤔 **PRICE CHECK ALERT:**\n")
             
             for i, correction in enumerate(correction_states, 1):
                 item_name = correction['item']
-                if correction['status'] == 'above':
-                    response += f"\n{i}. **{item_name}** is usually {format_cedi(correction['range']['min'])}-{format_cedi(correction['range']['max'])}\n"
-                    response += f"   Your price: {format_cedi(correction['amount'])} (higher by {format_cedi(correction['difference'])})"
-                else:  # below
-                    response += f"\n{i}. **{item_name}** is usually {format_cedi(correction['range']['min'])}-{format_cedi(correction['range']['max'])}\n"
-                    response += f"   Your price: {format_cedi(correction['amount'])} (lower by {format_cedi(correction['difference'])})"
-            
-            response += "\n\n**Is this because:**"
-            response += "\n1. Special/bulk purchase?"
-            response += "\n2. Different quality/brand?"
-            response += "\n3. Wrong amount?"
-            response += "\n4. Update price range?"
-            response += "\n5. Ignore (it's correct)"
-            response += "\n\n**Reply with numbers** (e.g., '1' or '1,4')"
+                direction = "higher" if correction['status'] == 'above' else "lower"
+                parts.append(f"\n{i}. **{item_name}** is usually {format_cedi(correction['range']['min'])}-{format_cedi(correction['range']['max'])}\n")
+                parts.append(f"   Your price: {format_cedi(correction['amount'])} ({direction} by {format_cedi(correction['difference'])})")
+            
+            parts.append(
+                "\n\n**Is this because:**"
+                "\n1. Special/bulk purchase?"
+                "\n2. Different quality/brand?"
+                "\n3. Wrong amount?"
+                "\n4. Update price range?"
+                "\n5. Ignore (it's correct)"
+                "\n\n**Reply with numbers** (e.g., '1' or '1,4')"
+            )
 
             # Store all state IDs for this transaction
-            state_ids = [c['state_id'] for c in correction_states]
-            correction_state.states[transaction_id] = {
-                'state_ids': state_ids,
-                'user_id': user_name,
-                'timestamp': time.time(),
-                'expires_at': time.time() + 300
-            }
-        
-        # Record price history for detected items and category
-        for item in detected_items:
-            quantity, unit = detect_quantity_and_unit(clean_description)
-            record_price_history(
-                item['item'],
-                amount,
-                trans_type,
-                user_name,
-                transaction_id,
-                quantity,
-                unit
-            )
-        
-        if category:
-            record_price_history(
-                f"#{category}",
-                amount,
-                trans_type,
-                user_name,
-                transaction_id,
-                1,  # Categories don't have quantity
-                ""
-            )
+            correction_state.add_transaction(transaction_id, user_name, [c['state_id'] for c in correction_states])
         
-        # Check budget alerts for category
-        if category:
-            budget_alert = update_budget_spending(f"#{category}", amount, user_name)
-            if budget_alert:
-                response += f"\n\n⚠️ **BUDGET ALERT:** #{category}\n"
-                response += f"Spent: {format_cedi(budget_alert['spent'])} of {format_cedi(budget_alert['budget_amount'])}\n"
-                response += f"Remaining: {format_cedi(budget_alert['remaining'])}\n"
-                response += f"Progress: {budget_alert['percent_spent']:.1f}% (alert at {budget_alert['alert_threshold']}%)"
+        # Budget alert for category
+        if budget_alert:
+            parts.append(f"\n\n⚠️ **BUDGET ALERT:** #{category}\n")
+            parts.append(f"Spent: {format_cedi(budget_alert['spent'])} of {format_cedi(budget_alert['budget_amount'])}\n")
+            parts.append(f"Remaining: {format_cedi(budget_alert['remaining'])}\n")
+            parts.append(f"Progress: {budget_alert['percent_spent']:.1f}% (alert at {budget_alert['alert_threshold']}%)")
         
         # Smart Expense Audit for expenses
-        if trans_type.lower() == 'expense':
+        if type_key == 'expense':
             audit_msg = audit_expense(category, amount, user_name)
             if audit_msg:
-                response += f"\n{audit_msg}"
+                parts.append(f"\n{audit_msg}")
         
         order_response = None
-        if trans_type.lower() == 'sale':
+        if type_key == 'sale':
             order_response = record_order(amount, description, user_name, linked_sale_id=transaction_id)
             
         if order_response:
-            response += "\n\n" + order_response
+            parts.append("\n\n" + order_response)
             
-        return response
+        return ''.join(parts)
         
     except Exception as e:
         return f"❌ Failed to save: {str(e)[:100]}"
 
 def get_transactions(sheet_name, start_date=None, end_date=None, user_filter=None):
     """Get transactions from a sheet with optional filtering."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return []
     
     try:
-        worksheet = spreadsheet.worksheet(sheet_name)
-        all_rows = worksheet.get_all_values()
-        
+        transactions = transactions_between(sheet_name, start_date, end_date)
+    except Exception:
+        return []
+    
+    # Filters run against the cached rows, not a fresh fetch
+    if user_filter:
+        return [t for t in transactions if t['user'] == user_filter]
+    return list(transactions)
+
+def parse_transactions(sheet_name, all_rows, columns=None, essential_ok=None):
+    """Turn raw ledger rows (header first) into transaction dicts."""
+    try:
         if len(all_rows) <= 1:
             return []
         
-        headers = [h.strip().lower() for h in all_rows[0]]
-        
-        # Find column indices
-        id_idx = find_column_index(headers, 'id')
-        date_idx = find_column_index(headers, 'date')
-        amount_idx = find_column_index(headers, 'amount')
-        desc_idx = find_column_index(headers, 'description')
-        user_idx = find_column_index(headers, 'user')
-        category_idx = find_column_index(headers, 'category')
-        type_idx = find_column_index(headers, 'type')
+        if columns is None:
+            columns = header_index(all_rows[0])
+            essential_ok = all(c in columns for c in LEDGER_ESSENTIAL_COLUMNS)
         
         # Essential columns must exist
-        if -1 in [date_idx, amount_idx, desc_idx, user_idx]:
+        if not essential_ok:
             return []
         
+        # Find column indices
+        id_idx = columns.get('id', -1)
+        date_idx = columns['date']
+        amount_idx = columns['amount']
+        desc_idx = columns['description']
+        user_idx = columns['user']
+        category_idx = columns.get('category', -1)
+        type_idx = columns.get('type', -1)
+        
         transactions = []
         
-        for row in all_rows[1:]:
+        for row_number, row in enumerate(all_rows[1:], start=2):
             if len(row) <= max(date_idx, amount_idx, desc_idx, user_idx):
                 continue
             
@@ -2295,14 +3431,6 @@ def get_transactions(sheet_name, start_date=None, end_date=None, user_filter=Non
                 # Infer from sheet name
                 trans_type = 'sale' if sheet_name.lower() == 'sales' else 'expense'
             
-            # Apply filters
-            if start_date and date_str < start_date:
-                continue
-            if end_date and date_str > end_date:
-                continue
-            if user_filter and user != user_filter:
-                continue
-            
             try:
                 amount = float(amount_str) if amount_str else 0.0
                 transactions.append({
@@ -2313,7 +3441,8 @@ def get_transactions(sheet_name, start_date=None, end_date=None, user_filter=Non
                     'description': description,
                     'user': user,
                     'category': category,
-                    'sheet': sheet_name
+                    'sheet': sheet_name,
+                    'row': row_number
                 })
             except ValueError:
                 continue
@@ -2325,23 +3454,13 @@ def get_transactions(sheet_name, start_date=None, end_date=None, user_filter=Non
 
 def get_balance():
     """Calculate current balance with proper negative handling."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return "❌ Bot error: Not connected to database."
     
-    balance = 0.0
-    transaction_count = 0
-    
-    # Check all transaction sheets
-    for sheet_name in ['Sales', 'Expenses', 'Income']:
-        transactions = get_transactions(sheet_name)
-        
-        for trans in transactions:
-            if trans['type'] in ['sale', 'income']:
-                balance += trans['amount']
-            elif trans['type'] == 'expense':
-                balance -= trans['amount']
-            
-            transaction_count += 1
+    # Single pass over all transaction sheets; unknown types count but add nothing
+    signed = [TYPE_SIGN.get(trans['type'], 0.0) * trans['amount'] for trans in iter_ledger_transactions()]
+    balance = sum(signed)
+    transaction_count = len(signed)
     
     # Format with proper negative sign
     if balance < 0:
@@ -2369,6 +3488,7 @@ def list_user_transactions(user_name, limit=10):
     all_transactions = []
     
     # Get transactions from all sheets
+    prefetch_ledgers()
     for sheet_name in ['Sales', 'Expenses', 'Income']:
         transactions = get_transactions(sheet_name, user_filter=user_name)
         all_transactions.extend(transactions)
@@ -2376,43 +3496,36 @@ def list_user_transactions(user_name, limit=10):
     if not all_transactions:
         return "📭 No transactions found."
     
-    # Sort by date (newest first)
-    all_transactions.sort(key=lambda x: x['date'], reverse=True)
-    all_transactions = all_transactions[:limit]
+    # Newest first; only the top `limit` are needed, so skip the full sort
+    all_transactions = heapq.nlargest(limit, all_transactions, key=operator.itemgetter('date'))
     
-    response = "📋 **YOUR RECENT TRANSACTIONS:**\n\n"
+    parts = ["📋 **YOUR RECENT TRANSACTIONS:**\n\n"]
     
     for i, trans in enumerate(all_transactions, 1):
-        emoji = "💰" if trans['type'] in ['sale', 'income'] else "💸"
+        emoji = "💰" if trans['type'] in INCOME_TYPES else "💸"
         
-        response += f"{i}. {emoji} `{trans['id'] if trans['id'] else 'NO-ID'}`\n"
-        response += f"   {format_cedi(trans['amount'])} - {trans['description'][:40]}\n"
-        response += f"   📅 {trans['date']} | {trans['type'].upper()}"
+        parts.append(f"{i}. {emoji} `{trans['id'] if trans['id'] else 'NO-ID'}`\n")
+        parts.append(f"   {format_cedi(trans['amount'])} - {trans['description'][:40]}\n")
+        parts.append(f"   📅 {trans['date']} | {trans['type'].upper()}")
         if trans['category']:
-            response += f" | #{trans['category']}"
-        response += "\n\n"
+            parts.append(f" | #{trans['category']}")
+        parts.append("\n\n")
     
     if any(trans['id'] for trans in all_transactions):
-        response += "💡 **Delete with:** `/delete ID:YOUR-ID-HERE`"
+        parts.append("💡 **Delete with:** `/delete ID:YOUR-ID-HERE`")
     else:
-        response += "⚠️ **Note:** Older transactions don't have IDs. Use `/delete last`"
+        parts.append("⚠️ **Note:** Older transactions don't have IDs. Use `/delete last`")
     
-    return response
+    return ''.join(parts)
 
 def find_transaction_by_id(transaction_id, user_name):
     """Find a specific transaction by ID."""
     if not transaction_id:
         return None
     
-    # Determine sheet from ID prefix
+    # Determine sheet from ID prefix, so a known prefix only touches one sheet
     id_prefix = transaction_id.split('-')[0].upper()
-    sheet_map = {
-        'SAL': 'Sales',
-        'EXP': 'Expenses',
-        'INC': 'Income'
-    }
-    
-    sheet_name = sheet_map.get(id_prefix)
+    sheet_name = ID_PREFIX_TO_SHEET.get(id_prefix)
     if not sheet_name:
         # Search all sheets
         sheet_names = ['Sales', 'Expenses', 'Income']
@@ -2420,16 +3533,18 @@ def find_transaction_by_id(transaction_id, user_name):
         sheet_names = [sheet_name]
     
     for sheet in sheet_names:
-        transactions = get_transactions(sheet, user_filter=user_name)
-        for trans in transactions:
-            if trans['id'] == transaction_id:
-                return trans
+        try:
+            trans = lookup_transaction(sheet, transaction_id)
+        except Exception:
+            continue
+        if trans and (not user_name or trans['user'] == user_name):
+            return trans
     
     return None
 
 def delete_transaction_by_id(transaction_id, user_name):
     """Delete a transaction by its ID."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return "❌ Bot error: Not connected to database."
     
     # Find the transaction
@@ -2439,24 +3554,31 @@ def delete_transaction_by_id(transaction_id, user_name):
     
     try:
         # Get the original worksheet
-        original_sheet = spreadsheet.worksheet(transaction['sheet'])
-        all_rows = original_sheet.get_all_values()
+        sheet_name = transaction['sheet']
+        original_sheet = get_worksheet(sheet_name)
+        ledger = load_ledger(sheet_name)
         
-        if len(all_rows) <= 1:
+        if len(ledger['rows']) <= 1:
             return "❌ Transaction not found."
         
-        headers = [h.strip().lower() for h in all_rows[0]]
-        id_idx = find_column_index(headers, 'id')
+        id_idx = ledger['columns'].get('id', -1)
         
         if id_idx == -1:
             return "❌ This sheet doesn't have ID column yet."
         
-        # Find the row index
-        row_index = None
-        for i, row in enumerate(all_rows[1:], start=2):
-            if len(row) > id_idx and row[id_idx].strip() == transaction_id:
-                row_index = i
-                break
+        # Row number comes from the cached read; confirm it still holds this ID
+        # (one row read) so a stale cache can never delete the wrong row
+        row_index = transaction.get('row')
+        if row_index:
+            row = original_sheet.row_values(row_index)
+            if len(row) <= id_idx or row[id_idx].strip() != transaction_id:
+                row_index = None
+        
+        if not row_index:
+            # Sheet changed since it was cached: re-read it and look again
+            invalidate_transactions(sheet_name)
+            fresh = lookup_transaction(sheet_name, transaction_id)
+            row_index = fresh['row'] if fresh else None
         
         if not row_index:
             return "❌ Transaction not found in sheet."
@@ -2466,6 +3588,7 @@ def delete_transaction_by_id(transaction_id, user_name):
         
         # Delete from original sheet
         original_sheet.delete_rows(row_index)
+        invalidate_transactions(sheet_name)
         
         return f"✅ Deleted transaction `{transaction_id}` ({format_cedi(transaction['amount'])})"
         
@@ -2474,37 +3597,38 @@ def delete_transaction_by_id(transaction_id, user_name):
 
 def archive_deleted_transaction(transaction, deleted_by):
     """Move transaction to DeletedTransactions tab."""
+    # Prepare deleted record
+    deleted_row = [
+        transaction['id'],                            # ID
+        transaction['date'],                          # Date
+        transaction['type'],                          # Type
+        transaction['amount'],                        # Amount
+        transaction['description'],                   # Description
+        transaction['category'],                      # Category
+        transaction['user'],                          # User
+        transaction['sheet'],                         # Original_Sheet
+        datetime.now().strftime('%Y-%m-%d %I:%M %p'), # Deleted_Timestamp
+        f"Deleted by {deleted_by} via ID"             # Reason
+    ]
+    
+    # The sheet is created at startup, so append straight away and only create it on failure
     try:
-        # Get or create DeletedTransactions sheet
-        try:
-            deleted_sheet = spreadsheet.worksheet('DeletedTransactions')
-        except gspread.exceptions.WorksheetNotFound:
-            deleted_sheet = spreadsheet.add_worksheet(
-                title='DeletedTransactions',
-                rows=10000,
-                cols=10
-            )
-            deleted_sheet.append_row([
-                'ID', 'Date', 'Type', 'Amount', 'Description', 
-                'Category', 'User', 'Original_Sheet', 'Deleted_Timestamp', 'Reason'
-            ])
-        
-        # Prepare deleted record
-        deleted_row = [
-            transaction['id'],                            # ID
-            transaction['date'],                          # Date
-            transaction['type'],                          # Type
-            transaction['amount'],                        # Amount
-            transaction['description'],                   # Description
-            transaction['category'],                      # Category
-            transaction['user'],                          # User
-            transaction['sheet'],                         # Original_Sheet
-            datetime.now().strftime('%Y-%m-%d %I:%M %p'), # Deleted_Timestamp
-            f"Deleted by {deleted_by} via ID"             # Reason
-        ]
-        
-        deleted_sheet.append_row(deleted_row)
-        
+        append_values('DeletedTransactions', [deleted_row])
+        return
+    except Exception:
+        pass
+    
+    try:
+        deleted_sheet = create_worksheet(
+            title='DeletedTransactions',
+            rows=10000,
+            cols=10
+        )
+        deleted_sheet.append_row([
+            'ID', 'Date', 'Type', 'Amount', 'Description', 
+            'Category', 'User', 'Original_Sheet', 'Deleted_Timestamp', 'Reason'
+        ])
+        append_values('DeletedTransactions', [deleted_row])
     except Exception:
         pass  # Archive is optional
 
@@ -2512,15 +3636,15 @@ def delete_last_transaction(user_name):
     """Delete user's most recent transaction."""
     # Get user's recent transactions
     recent = []
+    prefetch_ledgers()
     for sheet in ['Sales', 'Expenses', 'Income']:
         recent.extend(get_transactions(sheet, user_filter=user_name))
     
     if not recent:
         return "❌ No recent transactions found."
     
-    # Sort by date (newest first)
-    recent.sort(key=lambda x: x['date'], reverse=True)
-    last_transaction = recent[0]
+    # Newest transaction (first one wins on equal dates, as with a stable sort)
+    last_transaction = max(recent, key=lambda x: x['date'])
     
     if not last_transaction['id']:
         # Old transaction without ID - use old deletion method
@@ -2532,31 +3656,50 @@ def delete_last_transaction(user_name):
 def delete_old_transaction(transaction, user_name):
     """Delete old transaction without ID (backward compatibility)."""
     try:
-        original_sheet = spreadsheet.worksheet(transaction['sheet'])
+        sheet_name = transaction['sheet']
+        original_sheet = get_worksheet(sheet_name)
+        
+        def matches(row):
+            return (len(row) > max(date_idx, amount_idx, user_idx) and
+                    row[date_idx].strip() == transaction['date'] and
+                    row[user_idx].strip() == user_name and
+                    abs(float(row[amount_idx]) - transaction['amount']) < 0.01)
+        
+        def delete_row(i):
+            # Archive
+            archive_deleted_transaction(transaction, user_name)
+            
+            # Delete
+            original_sheet.delete_rows(i)
+            invalidate_transactions(sheet_name)
+            
+            return f"✅ Deleted old transaction ({format_cedi(transaction['amount'])})"
+        
+        # Fast path: exact (date, user, amount) lookup against the cached rows
+        columns = load_ledger(sheet_name)['columns']
+        date_idx = columns.get('date', -1)
+        amount_idx = columns.get('amount', -1)
+        user_idx = columns.get('user', -1)
+        key = (transaction['date'], user_name, round(transaction['amount'], 2))
+        row_index = legacy_row_index(sheet_name).get(key)
+        if row_index and matches(original_sheet.row_values(row_index)):
+            return delete_row(row_index)
+        
+        # Miss (or the sheet moved under us): scan the live sheet
         all_rows = original_sheet.get_all_values()
         
         if len(all_rows) <= 1:
             return "❌ Transaction not found."
         
-        headers = [h.strip().lower() for h in all_rows[0]]
-        date_idx = find_column_index(headers, 'date')
-        amount_idx = find_column_index(headers, 'amount')
-        user_idx = find_column_index(headers, 'user')
+        columns = header_index(all_rows[0])
+        date_idx = columns.get('date', -1)
+        amount_idx = columns.get('amount', -1)
+        user_idx = columns.get('user', -1)
         
         # Find the row by matching multiple fields
         for i, row in enumerate(all_rows[1:], start=2):
-            if (len(row) > max(date_idx, amount_idx, user_idx) and
-                row[date_idx].strip() == transaction['date'] and
-                row[user_idx].strip() == user_name and
-                abs(float(row[amount_idx]) - transaction['amount']) < 0.01):
-                
-                # Archive
-                archive_deleted_transaction(transaction, user_name)
-                
-                # Delete
-                original_sheet.delete_rows(i)
-                
-                return f"✅ Deleted old transaction ({format_cedi(transaction['amount'])})"
+            if matches(row):
+                return delete_row(i)
         
         return "❌ Could not find matching transaction."
         
@@ -2570,6 +3713,7 @@ def get_today_summary():
     
     # Get all transactions from today
     all_today = []
+    prefetch_ledgers()
     for sheet in ['Sales', 'Expenses', 'Income']:
         all_today.extend(get_transactions(sheet, start_date=today_str, end_date=today_str))
     
@@ -2577,7 +3721,7 @@ def get_today_summary():
         return f"📊 TODAY'S SUMMARY ({today_str})\n\n📭 No transactions today yet."
     
     # Separate by type
-    income = [t for t in all_today if t['type'] in ['sale', 'income']]
+    income = [t for t in all_today if t['type'] in INCOME_TYPES]
     expenses = [t for t in all_today if t['type'] == 'expense']
     
     total_income = sum(t['amount'] for t in income)
@@ -2586,48 +3730,50 @@ def get_today_summary():
     
     emoji = "📈" if net > 0 else "📉" if net < 0 else "➖"
     
-    message = f"""📊 TODAY'S SUMMARY ({today_str})
+    parts = [f"""📊 TODAY'S SUMMARY ({today_str})
 {emoji} Net: {format_cedi(net)}
 
 💰 Income/Sales: {format_cedi(total_income)} ({len(income)} transactions)
-💸 Expenses: {format_cedi(total_expenses)} ({len(expenses)} transactions)"""
+💸 Expenses: {format_cedi(total_expenses)} ({len(expenses)} transactions)"""]
     
     if income:
         top_income = max(income, key=lambda x: x['amount'])
-        message += f"\n\n👑 Top Income: {format_cedi(top_income['amount'])}"
+        parts.append(f"\n\n👑 Top Income: {format_cedi(top_income['amount'])}")
     
     if expenses:
         top_expense = max(expenses, key=lambda x: x['amount'])
-        message += f"\n💸 Top Expense: {format_cedi(top_expense['amount'])}"
+        parts.append(f"\n💸 Top Expense: {format_cedi(top_expense['amount'])}")
     
     # Add profit goal progress
     goal_progress = get_goal_progress("profit")
     if goal_progress:
-        message += goal_progress
+        parts.append(goal_progress)
         
     # Check for due recurring items
     recurring_msg = check_recurring_due(user_name="User")
     if recurring_msg:
-        message += f"\n\n{recurring_msg}"
+        parts.append(f"\n\n{recurring_msg}")
         
-    return message
+    return ''.join(parts)
+
+def aggregate_categories():
+    """Total amount and transaction count per category across all sheets, in one pass."""
+    category_totals = defaultdict(float)
+    category_counts = defaultdict(int)
+    
+    for trans in iter_ledger_transactions():
+        category = trans['category'] or "Uncategorized"
+        category_totals[category] += trans['amount']
+        category_counts[category] += 1
+    
+    return category_totals, category_counts
 
 def get_categories_report():
     """Generate categories report."""
-    if not spreadsheet:
+    if not get_spreadsheet():
         return "❌ Bot error: Not connected to database."
     
-    category_totals = defaultdict(float)
-    category_counts = defaultdict(int)
-    
-    # Check all transaction sheets
-    for sheet_name in ['Sales', 'Expenses', 'Income']:
-        transactions = get_transactions(sheet_name)
-        
-        for trans in transactions:
-            category = trans['category'] if trans['category'] else "Uncategorized"
-            category_totals[category] += trans['amount']
-            category_counts[category] += 1
+    category_totals, category_counts = aggregate_categories()
     
     if not category_totals:
         return "📭 No categorized transactions found.\n\n💡 **Tip:** Add #hashtag to descriptions:\nExample: +expense 500 #marketing Facebook ads"
@@ -2635,30 +3781,30 @@ def get_categories_report():
     # Sort by total amount
     sorted_categories = sorted(category_totals.items(), key=lambda x: x[1], reverse=True)
     
-    report = "📊 **CATEGORIES REPORT**\n\n"
+    parts = ["📊 **CATEGORIES REPORT**\n\n"]
     
     for category, total in sorted_categories:
         count = category_counts[category]
-        report += f"**#{category}**: {format_cedi(total)} ({count} transactions)\n"
+        parts.append(f"**#{category}**: {format_cedi(total)} ({count} transactions)\n")
     
     # Add summary
     total_transactions = sum(category_counts.values())
     total_amount = sum(category_totals.values())
     
-    report += f"\n📈 **Summary:**\n"
-    report += f"• Total Categories: {len(category_totals)}\n"
-    report += f"• Total Transactions: {total_transactions}\n"
-    report += f"• Total Amount: {format_cedi(total_amount)}\n"
+    parts.append(f"\n📈 **Summary:**\n")
+    parts.append(f"• Total Categories: {len(category_totals)}\n")
+    parts.append(f"• Total Transactions: {total_transactions}\n")
+    parts.append(f"• Total Amount: {format_cedi(total_amount)}\n")
     
     if len(sorted_categories) >= 3:
-        report += f"\n🏆 **Top 3 Categories:**\n"
+        parts.append(f"\n🏆 **Top 3 Categories:**\n")
         for i, (category, total) in enumerate(sorted_categories[:3], 1):
             emoji = "👑" if i == 1 else "🥈" if i == 2 else "🥉"
-            report += f"{emoji} #{category}: {format_cedi(total)}\n"
+            parts.append(f"{emoji} #{category}: {format_cedi(total)}\n")
     
-    report += "\n💡 Add #hashtag to any transaction to categorize it!"
+    parts.append("\n💡 Add #hashtag to any transaction to categorize it!")
     
-    return report
+    return ''.join(parts)
 
 def get_period_summary(period):
     """Get summary for week or month."""
@@ -2667,13 +3813,14 @@ def get_period_summary(period):
     
     # Get all transactions in period
     all_period = []
+    prefetch_ledgers()
     for sheet in ['Sales', 'Expenses', 'Income']:
         all_period.extend(get_transactions(sheet, start_date=start_date, end_date=end_date))
     
     if not all_period:
         return f"📅 {period_name}LY REPORT ({start_date} to {end_date})\n\n📭 No transactions in this period."
     
-    income = [t for t in all_period if t['type'] in ['sale', 'income']]
+    income = [t for t in all_period if t['type'] in INCOME_TYPES]
     expenses = [t for t in all_period if t['type'] == 'expense']
     
     total_income = sum(t['amount'] for t in income)
@@ -2682,32 +3829,32 @@ def get_period_summary(period):
     
     emoji = "📈" if net > 0 else "📉" if net < 0 else "➖"
     
-    message = f"""📅 {period_name}LY REPORT ({start_date} to {end_date})
+    parts = [f"""📅 {period_name}LY REPORT ({start_date} to {end_date})
 {emoji} Total Profit: {format_cedi(net)}
 
 💰 Total Income: {format_cedi(total_income)} ({len(income)} transactions)
-💸 Total Expenses: {format_cedi(total_expenses)} ({len(expenses)} transactions)"""
+💸 Total Expenses: {format_cedi(total_expenses)} ({len(expenses)} transactions)"""]
     
     if income:
         avg_income = total_income / len(income)
-        message += f"\n📊 Avg Income: {format_cedi(avg_income)}"
+        parts.append(f"\n📊 Avg Income: {format_cedi(avg_income)}")
     
     if expenses:
         avg_expense = total_expenses / len(expenses)
-        message += f"\n📊 Avg Expense: {format_cedi(avg_expense)}"
+        parts.append(f"\n📊 Avg Expense: {format_cedi(avg_expense)}")
     
     # Add profit goal progress for current month
     if period == 'month':
         goal_progress = get_goal_progress("profit")
         if goal_progress:
-            message += goal_progress
+            parts.append(goal_progress)
         
         # Check for due recurring items
         recurring_msg = check_recurring_due(user_name="User")
         if recurring_msg:
-            message += f"\n\n{recurring_msg}"
+            parts.append(f"\n\n{recurring_msg}")
             
-    return message
+    return ''.join(parts)
 
 def get_date_range(period):
     """Get start and end dates for period."""
@@ -2730,14 +3877,13 @@ def get_date_range(period):
 def get_status():
     """Get bot status information."""
     return {
-        'status': 'connected' if spreadsheet else 'disconnected',
+        'status': 'connected' if get_spreadsheet() else 'disconnected',
         'price_training': 'enabled'
     }
 
 # ==================== COMPREHENSIVE HELP & TUTORIAL SYSTEM ====================
-def get_tutorial_message():
-    """Returns step-by-step tutorial for new users."""
-    return """🎓 **LEDGER BOT TUTORIAL - GET STARTED IN 5 MINUTES**
+# The guides are static, so they are built once at import time.
+TUTORIAL_MESSAGE = """🎓 **LEDGER BOT TUTORIAL - GET STARTED IN 5 MINUTES**
 
 **STEP 1: RECORD YOUR FIRST TRANSACTION**
 Try this:
@@ -2856,9 +4002,11 @@ Professional billing:
 
 Type `help` for complete command reference, or just start recording!"""
 
-def get_quick_start_guide():
-    """Quick start guide for immediate use."""
-    return """🚀 **QUICK START GUIDE**
+def get_tutorial_message():
+    """Returns step-by-step tutorial for new users."""
+    return TUTORIAL_MESSAGE
+
+QUICK_START_MESSAGE = """🚀 **QUICK START GUIDE**
 
 **JUST NEED TO RECORD SOMETHING?**
 1. Expense: `+expense [amount] [what it was for]`
@@ -2900,9 +4048,11 @@ Add #hashtags to descriptions:
 
 **THAT'S IT!** Start recording and the bot will guide you."""
 
-def get_help_message():
-    """Returns comprehensive help message."""
-    return """📖 **LEDGER BOT - COMPLETE COMMAND REFERENCE**
+def get_quick_start_guide():
+    """Quick start guide for immediate use."""
+    return QUICK_START_MESSAGE
+
+HELP_MESSAGE = """📖 **LEDGER BOT - COMPLETE COMMAND REFERENCE**
 
 **📝 RECORD TRANSACTIONS:**
 • `+sale [amount] [description]`
@@ -2994,9 +4144,11 @@ When price is unusual, bot asks:
 
 Need specific help? Try a command and the bot will guide you!"""
 
-def get_examples_message():
-    """Show practical examples of usage."""
-    return """💡 **PRACTICAL EXAMPLES**
+def get_help_message():
+    """Returns comprehensive help message."""
+    return HELP_MESSAGE
+
+EXAMPLES_MESSAGE = """💡 **PRACTICAL EXAMPLES**
 
 **PRICE TRAINING EXAMPLES:**
 1. Train coffee prices:
@@ -3076,24 +4228,614 @@ def get_examples_message():
 5. `price_history "coffee"`
 6. `remind`"""
 
+def get_examples_message():
+    """Show practical examples of usage."""
+    return EXAMPLES_MESSAGE
+
 # ==================== MAIN COMMAND PROCESSOR (UPDATED WITH ALL NEW FEATURES) ====================
+# ==================== COMMAND HANDLERS ====================
+# Each legacy command is a handler taking (text, text_lower, tokens, user_name),
+# where tokens is text.split() done once per message;
+# process_command picks one from EXACT_CMDS / PREFIX_CMDS below.
+
+def _handle_tutorial(text, text_lower, tokens, user_name):
+    """Step-by-step tutorial."""
+    return TUTORIAL_MESSAGE
+
+def _handle_quickstart(text, text_lower, tokens, user_name):
+    """Quick start guide."""
+    return QUICK_START_MESSAGE
+
+def _handle_examples(text, text_lower, tokens, user_name):
+    """Example commands."""
+    return EXAMPLES_MESSAGE
+
+def _handle_help(text, text_lower, tokens, user_name):
+    """Full command list."""
+    return HELP_MESSAGE
+
+def _handle_unitprice(text, text_lower, tokens, user_name):
+    """unitprice [total] [description with quantity]"""
+    if len(tokens) >= 3:
+        try:
+            amount = float(tokens[1])
+            description = ' '.join(tokens[2:])
+            result = calculate_unit_price(amount, description)
+            if result:
+                return result
+            else:
+                return "❌ Couldn't detect quantity in description. Format: 'unitprice 500 10 chairs'"
+        except ValueError:
+            return "❌ Invalid amount format"
+    return "❌ Format: unitprice [total] [description with quantity]"
+
+def _handle_price_history(text, text_lower, tokens, user_name):
+    """price_history [item] - price trends for an item."""
+    if len(tokens) >= 2:
+        item_name = ' '.join(tokens[1:])
+        # Remove quotes if present
+        if item_name.startswith('"') and item_name.endswith('"'):
+            item_name = item_name[1:-1]
+        
+        trends = analyze_price_trends(item_name)
+        if not trends:
+            return f"❌ Not enough price history for '{item_name}'\n💡 Record more transactions with this item to see trends."
+        
+        emoji = "📈" if trends['trend'] == 'up' else "📉" if trends['trend'] == 'down' else "➖"
+        
+        parts = [f"{emoji} **PRICE TRENDS: {trends['item'].title()}**\n\n"]
+        parts.append(f"• **Data Points:** {trends['data_points']} transactions\n")
+        parts.append(f"• **Average Price:** {format_cedi(trends['average_price'])}\n")
+        parts.append(f"• **Range:** {format_cedi(trends['min_price'])} - {format_cedi(trends['max_price'])}\n")
+        parts.append(f"• **Recent Trend:** {trends['trend_percent']:.1f}% ({trends['trend']})\n")
+        
+        if trends['trend_percent'] > 10:
+            parts.append(f"⚠️ **Warning:** Prices increased significantly!\n")
+        elif trends['trend_percent'] < -10:
+            parts.append(f"✅ **Good news:** Prices decreased!\n")
+        
+        # Get recent history
+        history = get_price_history(item_name, days=30)
+        if history:
+            parts.append(f"\n📅 **Last {len(history)} purchases:**\n")
+            for h in history[-5:]:  # Show last 5
+                unit_price = h['price'] / h['quantity'] if h['quantity'] > 1 else h['price']
+                parts.append(f"• {h['date']}: {format_cedi(unit_price)}")
+                if h['quantity'] > 1:
+                    parts.append(f" each ({h['quantity']} {h['unit']} for {format_cedi(h['price'])})")
+                parts.append("\n")
+        
+        return ''.join(parts)
+    return "❌ Format: price_history [item]\nExample: price_history \"printer paper\""
+
+def _handle_compare(text, text_lower, tokens, user_name):
+    """compare [item] - best and worst deals for an item."""
+    if len(tokens) >= 2:
+        item_name = ' '.join(tokens[1:])
+        history = get_price_history(item_name, days=365)
+        
+        if not history:
+            return f"❌ No price history for '{item_name}'"
+        
+        # Find best and worst deals
+        unit_prices = []
+        for h in history:
+            if h['quantity'] > 0:
+                unit_prices.append({
+                    'date': h['date'],
+                    'unit_price': h['price'] / h['quantity'],
+                    'total': h['price'],
+                    'quantity': h['quantity']
+                })
+        
+        if not unit_prices:
+            return f"❌ Couldn't calculate unit prices for '{item_name}'"
+        
+        best_deal = min(unit_prices, key=lambda x: x['unit_price'])
+        worst_deal = max(unit_prices, key=lambda x: x['unit_price'])
+        avg_price = sum(u['unit_price'] for u in unit_prices) / len(unit_prices)
+        
+        parts = [f"🏷️ **PRICE COMPARISON: {item_name.title()}**\n\n"]
+        parts.append(f"✅ **Best Deal:** {format_cedi(best_deal['unit_price'])} on {best_deal['date']}\n")
+        parts.append(f"   ({best_deal['quantity']} for {format_cedi(best_deal['total'])})\n\n")
+        parts.append(f"❌ **Worst Deal:** {format_cedi(worst_deal['unit_price'])} on {worst_deal['date']}\n")
+        parts.append(f"   ({worst_deal['quantity']} for {format_cedi(worst_deal['total'])})\n\n")
+        parts.append(f"📊 **Average:** {format_cedi(avg_price)}\n")
+        parts.append(f"📈 **Price Range:** {format_cedi(best_deal['unit_price'])} - {format_cedi(worst_deal['unit_price'])}\n")
+        parts.append(f"📋 **Total Purchases:** {len(history)}\n")
+        
+        # Advice
+        if best_deal['unit_price'] < avg_price * 0.8:
+            parts.append(f"\n💡 **Tip:** Try to buy when price is around {format_cedi(best_deal['unit_price'])} like on {best_deal['date']}")
+        
+        return ''.join(parts)
+    return "❌ Format: compare [item]\nExample: compare \"coffee\""
+
+def _handle_set_budget(text, text_lower, tokens, user_name):
+    """+budget [category/item] [amount] [period] [alert_percentage]"""
+    if len(tokens) >= 4:
+        category_item = tokens[1]
+        try:
+            budget_amount = float(tokens[2])
+            period = tokens[3].lower()
+            alert_at = int(tokens[4]) if len(tokens) > 4 else 80
+            
+            if period not in PERIOD_NAMES:
+                return "❌ Period must be: daily, weekly, monthly"
+            
+            if not (0 < alert_at <= 100):
+                return "❌ Alert percentage must be between 1-100"
+            
+            return set_budget(category_item, budget_amount, period, user_name, alert_at)
+            
+        except ValueError:
+            return "❌ Invalid amount format. Example: +budget #marketing 1000 monthly 80"
+    return "❌ Format: +budget [category/item] [amount] [daily/weekly/monthly] [alert_percentage]\nExample: +budget #marketing 1000 monthly 80"
+
+def _handle_budgets(text, text_lower, tokens, user_name):
+    """Show the user's active budgets and alerts."""
+    alerts = check_budget_alerts(user_name)
+    
+    try:
+        all_rows = load_budgets()
+        
+        if len(all_rows) <= 1:
+            return "📭 No budgets set. Use +budget to create one."
+        
+        parts = ["💰 **YOUR BUDGETS:**\n\n"]
+        parts.append(format_budget_lines(active_user_budgets(user_name)))
+        
+        if alerts:
+            parts.append("🚨 **BUDGET ALERTS:**\n")
+            for alert in alerts:
+                parts.append(f"⚠️ **{alert['category_item']}**: {alert['percent_spent']:.1f}% spent!\n")
+                parts.append(f"   {format_cedi(alert['spent'])} of {format_cedi(alert['budget'])} (Remaining: {format_cedi(alert['remaining'])})\n\n")
+        
+        return ''.join(parts)
+        
+    except Exception:
+        return "❌ Cannot access budgets."
+
+def _handle_delete_budget(text, text_lower, tokens, user_name):
+    """+delete_budget [category/item]"""
+    if len(tokens) >= 2:
+        category_item = tokens[1]
+        
+        try:
+            worksheet = get_worksheet('Budgets')
+            
+            def matches(row):
+                return (len(row) > 8 and row[0].strip().lower() == category_item.lower() and
+                        row[8].strip() == user_name)
+            
+            # Cached row number, confirmed against the live row before writing to it
+            row_index = budget_row_index(category_item, user_name)
+            if row_index and not matches(worksheet.row_values(row_index)):
+                invalidate_budgets()
+                row_index = budget_row_index(category_item, user_name)
+            
+            if row_index:
+                worksheet.update_cell(row_index, 11, 'deleted')  # Update status
+                invalidate_budgets()
+                return f"✅ Deleted budget for {category_item}"
+            
+            return f"❌ No budget found for {category_item}"
+            
+        except Exception:
+            return "❌ Cannot access budgets."
+    return "❌ Format: +delete_budget [category/item]"
+
+def _handle_budget_summary(text, text_lower, tokens, user_name):
+    """Totals and top budgets by percent spent."""
+    try:
+        active_budgets = active_user_budgets(user_name)
+        if not active_budgets:
+            return "📭 No active budgets. Use +budget to create one."
+        
+        total_budget = sum(b['budget'] for b in active_budgets)
+        total_spent = sum(b['spent'] for b in active_budgets)
+        
+        parts = ["📊 **BUDGET SUMMARY**\n\n"]
+        parts.append(f"Total Budget: {format_cedi(total_budget)}\n")
+        parts.append(f"Total Spent: {format_cedi(total_spent)}\n")
+        parts.append(f"Remaining: {format_cedi(total_budget - total_spent)}\n")
+        parts.append(f"Overall Progress: {(total_spent/total_budget*100) if total_budget > 0 else 0:.1f}%\n\n")
+        
+        parts.append("**By Category/Item:**\n")
+        for budget in heapq.nlargest(10, active_budgets, key=operator.itemgetter('percent')):  # Top 10
+            emoji = "❌" if budget['percent'] >= 100 else "⚠️" if budget['percent'] >= 80 else "✅"
+            parts.append(f"{emoji} {budget['item']}: {budget['percent']:.1f}% ({format_cedi(budget['spent'])}/{format_cedi(budget['budget'])})\n")
+        
+        # Advice
+        if total_spent > total_budget * 0.8:
+            parts.append("\n⚠️ **Warning:** You've used 80%+ of total budget!")
+        elif total_spent < total_budget * 0.3:
+            parts.append("\n✅ **Good:** You're under 30% of total budget!")
+        
+        return ''.join(parts)
+        
+    except Exception:
+        return "❌ Cannot access budgets."
+
+def _handle_train(text, text_lower, tokens, user_name):
+    """+train "item" [min] [max] [unit]"""
+    item_name, min_price, max_price, unit = parse_train_command(text)
+    
+    if item_name is None:
+        # Error message is in the min_price variable
+        return min_price  # This contains the error message
+    
+    # Validate the prices
+    try:
+        min_price = float(min_price)
+        max_price = float(max_price)
+    except (ValueError, TypeError):
+        return "❌ Invalid price format. Use numbers like: 40 45"
+    
+    if min_price >= max_price:
+        return "❌ Minimum price must be less than maximum price."
+    
+    if max_price > 10000000:  # 10 million cedis sanity check
+        return "❌ Price seems unrealistic. Please check the amount."
+    
+    return train_price(item_name, min_price, max_price, unit, user_name)
+
+def _handle_forget(text, text_lower, tokens, user_name):
+    """+forget [item]"""
+    if len(tokens) < 2:
+        return "❌ Format: +forget [item]\nExample: +forget \"printer paper\""
+    
+    item_name = ' '.join(tokens[1:])
+    # Remove quotes if present
+    if item_name.startswith('"') and item_name.endswith('"'):
+        item_name = item_name[1:-1]
+    
+    return forget_price(item_name)
+
+def _handle_price_check(text, text_lower, tokens, user_name):
+    """price_check [item]"""
+    if len(tokens) < 2:
+        return "❌ Format: price_check [item]\nExample: price_check \"printer paper\""
+    
+    item_name = ' '.join(tokens[1:])
+    # Remove quotes if present
+    if item_name.startswith('"') and item_name.endswith('"'):
+        item_name = item_name[1:-1]
+    
+    price_info = check_price(item_name, 0)  # Check without amount
+    
+    if not price_info:
+        return f"❌ No price training found for '{item_name}'\n💡 Train it first with: +train \"{item_name}\" [min] [max]"
+    
+    range_info = price_info['range']
+    
+    response = f"💰 **PRICE CHECK: {range_info['item']}**\n\n"
+    response += f"Expected Range: ₵{range_info['min']:,.2f} - ₵{range_info['max']:,.2f}"
+    if range_info['unit']:
+        response += f" {range_info['unit']}"
+    response += f"\nConfidence: {range_info['confidence']}%"
+    
+    return response
+
+def _handle_show_prices(text, text_lower, tokens, user_name):
+    """List trained items."""
+    return list_trained_items()
+
+def _handle_order(text, text_lower, tokens, user_name):
+    """+order [amount] [description]"""
+    if len(tokens) < 3:
+        return "❌ Format: +order [amount] [description]\nExample: +order 40 birthday basic"
+    try:
+        amount = float(tokens[1])
+        description = ' '.join(tokens[2:])
+        return record_order(amount, description, user_name)
+    except ValueError:
+        return "❌ Amount must be a number."
+
+def _handle_done(text, text_lower, tokens, user_name):
+    """done [order_id] - delivered and paid."""
+    order_id = text[5:].strip().upper()
+    return update_order_status(order_id, status="Delivered", payment_status="Paid", user_name=user_name)
+
+def _handle_ready(text, text_lower, tokens, user_name):
+    """ready [order_id]"""
+    order_id = text[6:].strip().upper()
+    return update_order_status(order_id, status="Ready for Delivery", user_name=user_name)
+
+def _handle_paid(text, text_lower, tokens, user_name):
+    """paid [order_id]"""
+    order_id = text[5:].strip().upper()
+    return update_order_status(order_id, payment_status="Paid", user_name=user_name)
+
+def _handle_orders(text, text_lower, tokens, user_name):
+    """Recent orders."""
+    return get_orders(limit=10)
+
+def _handle_pending(text, text_lower, tokens, user_name):
+    """Pending orders."""
+    return get_orders(limit=20, pending_only=True)
+
+def _handle_search(text, text_lower, tokens, user_name):
+    """search [query] - search orders."""
+    query = text[7:].strip()
+    return search_orders(query)
+
+def _handle_reminders(text, text_lower, tokens, user_name):
+    """Order reminders."""
+    return get_order_reminders()
+
+def _handle_insights(text, text_lower, tokens, user_name):
+    """Service insights."""
+    return get_service_insights()
+
+def _handle_set_goal(text, text_lower, tokens, user_name):
+    """+goal [amount] [type]"""
+    if len(tokens) >= 2:
+        try:
+            amount = float(tokens[1])
+            target_type = tokens[2].lower() if len(tokens) > 2 else "profit"
+            return set_goal(amount, target_type, user_name)
+        except ValueError:
+            return "❌ Amount must be a number.\nExample: +goal 5000 profit"
+    return "❌ Format: +goal [amount] [type]"
+
+def _handle_goals(text, text_lower, tokens, user_name):
+    """This month's goal progress."""
+    progress = get_goal_progress("profit", user_name)
+    return progress if progress else "🎯 No active goals for this month. Set one with `+goal [amount]`!"
+
+def _handle_clients(text, text_lower, tokens, user_name):
+    """Top loyal clients."""
+    return list_clients(top_loyal=True)
+
+def _handle_list_clients(text, text_lower, tokens, user_name):
+    """All clients."""
+    return list_clients(top_loyal=False, limit=20)
+
+def _handle_client(text, text_lower, tokens, user_name):
+    """client [name or phone]"""
+    name = text[7:].strip()
+    profile = get_client_profile(name)
+    return profile if profile else f"🔍 No history found for '{name}'."
+
+def _handle_recurring(text, text_lower, tokens, user_name):
+    """+recurring [sale/expense] [amount] [daily/weekly/monthly] [description]"""
+    # Format: +recurring [sale/expense] [amount] [freq] [desc]
+    if len(tokens) >= 5:
+        try:
+            trans_type = tokens[1].lower()
+            amount = float(tokens[2])
+            freq = tokens[3].lower()
+            desc = ' '.join(tokens[4:])
+            return add_recurring_transaction(trans_type, amount, desc, freq, user_name)
+        except ValueError:
+            return "❌ Amount must be a number."
+    return "❌ Format: +recurring [sale/expense] [amount] [daily/weekly/monthly] [description]"
+
+def _handle_record_due(text, text_lower, tokens, user_name):
+    """Record every recurring item that is due."""
+    return check_recurring_due(user_name, auto_record=True)
+
+def _handle_export(text, text_lower, tokens, user_name):
+    """/export [period] - financial report PDF."""
+    period = tokens[1].lower() if len(tokens) > 1 else 'month'
+    pdf_buffer, filename = generate_financial_report_pdf(period)
+    if pdf_buffer:
+        return {"type": "document", "buffer": pdf_buffer, "filename": filename}
+    return filename # error message
+
+def _handle_invoice(text, text_lower, tokens, user_name):
+    """/invoice [order_id] - invoice PDF."""
+    if len(tokens) < 2:
+        return "❌ Use: `/invoice ORDER_ID`"
+    order_id = tokens[1].upper()
+    pdf_buffer, filename = generate_invoice_pdf(order_id)
+    if pdf_buffer:
+        return {"type": "document", "buffer": pdf_buffer, "filename": filename}
+    return filename # error message
+
+def _handle_sale(text, text_lower, tokens, user_name):
+    """+sale [amount] [description]"""
+    if len(tokens) < 3:
+        return "❌ Format: +sale [amount] [description]\nExample: +sale 500 Website design\n💡 Add #hashtag to categorize: +sale 500 Website design #web"
+    try:
+        amount = float(tokens[1])
+        description = ' '.join(tokens[2:])
+        return record_transaction('sale', amount, description, user_name)
+    except ValueError:
+        return "❌ Amount must be a number.\n💡 Example: +sale 500 Website design"
+
+def _handle_expense(text, text_lower, tokens, user_name):
+    """+expense [amount] [description]"""
+    if len(tokens) < 3:
+        return "❌ Format: +expense [amount] [description]\nExample: +expense 100 Office supplies\n💡 Add #hashtag to categorize: +expense 100 Office supplies #office"
+    try:
+        amount = float(tokens[1])
+        description = ' '.join(tokens[2:])
+        return record_transaction('expense', amount, description, user_name)
+    except ValueError:
+        return "❌ Amount must be a number.\n💡 Example: +expense 100 Office supplies"
+
+def _handle_income(text, text_lower, tokens, user_name):
+    """+income [amount] [description]"""
+    if len(tokens) < 3:
+        return "❌ Format: +income [amount] [description]\nExample: +income 1000 Investment\n💡 Add #hashtag to categorize: +income 1000 Investment #investment"
+    try:
+        amount = float(tokens[1])
+        description = ' '.join(tokens[2:])
+        return record_transaction('income', amount, description, user_name)
+    except ValueError:
+        return "❌ Amount must be a number.\n💡 Example: +income 1000 Investment"
+
+def _handle_balance(text, text_lower, tokens, user_name):
+    """Current balance."""
+    return get_balance()
+
+def _handle_today(text, text_lower, tokens, user_name):
+    """Today's summary."""
+    return get_today_summary()
+
+def _handle_week(text, text_lower, tokens, user_name):
+    """This week's summary."""
+    return get_period_summary('week')
+
+def _handle_month(text, text_lower, tokens, user_name):
+    """This month's summary."""
+    return get_period_summary('month')
+
+def _handle_categories(text, text_lower, tokens, user_name):
+    """Categories report."""
+    return get_categories_report()
+
+def _handle_list(text, text_lower, tokens, user_name):
+    """Recent transactions with IDs."""
+    try:
+        limit = int(tokens[1]) if len(tokens) > 1 else 10
+        return list_user_transactions(user_name, limit=min(limit, 20))
+    except:
+        return list_user_transactions(user_name, limit=10)
+
+def _handle_delete(text, text_lower, tokens, user_name):
+    """Smart deletion: /delete, /delete last, /delete ID:..., /delete list."""
+    delete_part = text_lower.replace('delete', '', 1).replace('/', '', 1).strip()
+    
+    if not delete_part:
+        return list_user_transactions(user_name, limit=5)
+    
+    elif delete_part == 'last':
+        return delete_last_transaction(user_name)
+    
+    elif delete_part.startswith('id:'):
+        transaction_id = delete_part[3:].strip().upper()
+        return delete_transaction_by_id(transaction_id, user_name)
+    
+    elif delete_part == 'list':
+        return list_user_transactions(user_name, limit=10)
+    
+    else:
+        return """🗑️ **DELETION HELP**
+
+**HOW TO DELETE:**
+1. First, find the transaction ID:
+   • Type `list` to see your recent transactions
+   • Each transaction shows an ID like `EXP-ABC123`
+
+2. Then delete it:
+   • `/delete ID:EXP-ABC123` - Delete specific transaction
+   • `/delete last` - Delete most recent
+   • `/delete` - Show options
+
+**EXAMPLE:**
+You record: `+expense 500 Test`
+It shows: "Recorded... ID: EXP-ABC123"
+You delete: `/delete ID:EXP-ABC123`"""
+
+def _handle_greeting(text, text_lower, tokens, user_name):
+    """Greeting reply."""
+    return f"Hello {user_name}! 👋 Ready to manage your finances?\n💡 Try `tutorial` for a step-by-step guide, or `quickstart` to jump right in!"
+
+# Whole-message commands -> handler
+EXACT_CMDS = {}
+for _names, _handler in [
+    (['tutorial', 'guide', 'walkthrough', 'learn', 'howto'], _handle_tutorial),
+    (['quickstart', 'quick', 'start', 'getting started'], _handle_quickstart),
+    (['examples', 'example', 'show me'], _handle_examples),
+    (['help', '/start', '/help', 'commands', 'menu', 'what can you do'], _handle_help),
+    (['budgets', 'my_budgets', 'show_budgets'], _handle_budgets),
+    (['budget_summary'], _handle_budget_summary),
+    (['show_prices', 'list_prices', 'trained_items', 'prices'], _handle_show_prices),
+    (['orders'], _handle_orders),
+    (['pending'], _handle_pending),
+    (['remind', 'reminders', 'pending_orders'], _handle_reminders),
+    (['insights', 'top services', 'service insights', 'reports'], _handle_insights),
+    (['goals', 'goal', 'my goals'], _handle_goals),
+    (['clients'], _handle_clients),
+    (['list clients'], _handle_list_clients),
+    (['record due'], _handle_record_due),
+    (['balance', 'profit', 'net'], _handle_balance),
+    (['today', 'today?', 'today.'], _handle_today),
+    (['week', 'weekly', 'this week'], _handle_week),
+    (['month', 'monthly', 'this month'], _handle_month),
+    (['categories', 'category', '/categories'], _handle_categories),
+    (['list', 'transactions', '/list'], _handle_list),
+    (['hi', 'hello', 'hey', 'hola', 'greetings'], _handle_greeting),
+]:
+    for _name in _names:
+        EXACT_CMDS[_name] = _handler
+
+# Command prefix -> handler. A trailing space means the command needs an argument
+# ('compare coffee'); the others also match glued text ('+train"tea" 1 2').
+PREFIX_CMDS = {
+    'unitprice ': _handle_unitprice,
+    'perunit ': _handle_unitprice,
+    'price_history ': _handle_price_history,
+    'trends ': _handle_price_history,
+    'compare ': _handle_compare,
+    'best_price ': _handle_compare,
+    '+budget ': _handle_set_budget,
+    'set_budget ': _handle_set_budget,
+    '+delete_budget ': _handle_delete_budget,
+    '+train': _handle_train,
+    '+forget': _handle_forget,
+    'price_check': _handle_price_check,
+    '+order': _handle_order,
+    'done ': _handle_done,
+    'ready ': _handle_ready,
+    'paid ': _handle_paid,
+    'search ': _handle_search,
+    '+goal ': _handle_set_goal,
+    'client ': _handle_client,
+    '+recurring ': _handle_recurring,
+    '/export': _handle_export,
+    '/invoice': _handle_invoice,
+    '+sale': _handle_sale,
+    '+expense': _handle_expense,
+    '+income': _handle_income,
+    'delete': _handle_delete,
+    '/delete': _handle_delete,
+}
+
+# Prefixes without the trailing space, in priority order, for glued input,
+# bucketed by first character so ordinary text skips the scan entirely
+LOOSE_PREFIX_CMDS = {}
+for _name, _handler in PREFIX_CMDS.items():
+    if not _name.endswith(' '):
+        LOOSE_PREFIX_CMDS.setdefault(_name[0], []).append((_name, _handler))
+
+def find_command_handler(text_lower):
+    """Resolve a cleaned, lowercased message to its command handler (or None)."""
+    handler = EXACT_CMDS.get(text_lower)
+    if handler:
+        return handler
+    
+    first, sep, _ = text_lower.partition(' ')
+    handler = PREFIX_CMDS.get(first + sep) or PREFIX_CMDS.get(first)
+    if handler:
+        return handler
+    
+    for prefix, handler in LOOSE_PREFIX_CMDS.get(text_lower[:1], ()):
+        if text_lower.startswith(prefix):
+            return handler
+    return None
+
 def process_command(user_input, user_name="User"):
     """Main command processor with all Phase 1 features."""
     if not user_input:
         return "🤔 I'm ready to help! Need to record a transaction or check your finances?"
     
+    # Anything still queued from the previous command is written before this one reads
+    flush_before_read()
+    
     text = user_input.strip()
     text_lower = text.lower()
 
     # Clean bot mentions
-    if BOT_USERNAME:
-        mention_prefix = f"@{BOT_USERNAME}"
-        if text_lower.startswith(mention_prefix.lower()):
-            text = text[len(mention_prefix):].strip()
-            text_lower = text.lower()
+    if MENTION_PREFIX and text_lower.startswith(MENTION_PREFIX):
+        text = text[len(MENTION_PREFIX):].strip()
+        text_lower = text.lower()
 
     # Clean punctuation
-    text_lower = re.sub(r'^[:\s]+|[:\s]+$', '', text_lower)
+    text_lower = EDGE_PUNCT_RE.sub('', text_lower)
 
     # ==================== INTERACTIVE ORDER FLOWS ====================
     order_state_response = handle_order_state(text, user_name)
@@ -3102,7 +4844,7 @@ def process_command(user_input, user_name="User"):
 
     # ==================== INTERACTIVE CORRECTIONS ====================
     # Check if this is a response to price correction
-    if text_lower.replace(',', '').replace(' ', '').isdigit():
+    if CORRECTION_REPLY_RE.fullmatch(text_lower):
         correction_response = handle_correction_response(text_lower, user_name)
         if correction_response:
             return correction_response
@@ -3131,7 +4873,7 @@ def process_command(user_input, user_name="User"):
             return conversational_response
 
         # Route to appropriate engine function based on Gemini's intent
-        if intent in ["record_expense", "record_sale", "record_income"]:
+        if intent in RECORD_INTENTS:
             trans_type = intent.replace("record_", "")
             
             # Use Gemini's confident answer, or ask for details if missing
@@ -3190,37 +4932,12 @@ def process_command(user_input, user_name="User"):
         elif intent == "check_budgets":
             # Reuse the budgets display logic
             try:
-                alerts = check_budget_alerts(user_name)
-                worksheet = spreadsheet.worksheet('Budgets')
-                all_rows = worksheet.get_all_values()
-                
-                if len(all_rows) <= 1:
+                budgets = active_user_budgets(user_name)
+                if not budgets:
                     return f"{conversational_response}\n\n📭 No budgets set. Use +budget to create one."
                 
                 response = f"{conversational_response}\n\n💰 **YOUR BUDGETS:**\n\n"
-                
-                for row in all_rows[1:]:
-                    if row and len(row) > 8 and row[8].strip() == user_name:
-                        try:
-                            category_item = row[0]
-                            budget_amount = float(row[2]) if len(row) > 2 and row[2] else 0
-                            period = row[3] if len(row) > 3 else ""
-                            current_spent = float(row[4]) if len(row) > 4 and row[4] else 0
-                            remaining = float(row[5]) if len(row) > 5 else budget_amount
-                            status = row[10] if len(row) > 10 else "active"
-                            
-                            if status.lower() != 'active':
-                                continue
-                            
-                            percent_spent = (current_spent / budget_amount * 100) if budget_amount > 0 else 0
-                            emoji = "❌" if percent_spent >= 100 else "⚠️" if percent_spent >= 90 else "📊" if percent_spent >= 50 else "✅"
-                            
-                            response += f"{emoji} **{category_item}**: {format_cedi(current_spent)} / {format_cedi(budget_amount)} {period}\n"
-                            response += f"   Remaining: {format_cedi(remaining)} | {percent_spent:.1f}% spent\n\n"
-                        except (ValueError, IndexError):
-                            continue
-                
-                return response
+                return response + format_budget_lines(budgets)
             except Exception:
                 return f"{conversational_response}\n\n📭 No budgets found."
                 
@@ -3232,13 +4949,13 @@ def process_command(user_input, user_name="User"):
                 return f"{conversational_response}\n\n{list_clients(top_loyal=True)}"
                 
         elif intent == "export_report":
-            period = target if target in ['today', 'week', 'month'] else 'month'
+            period = target if target in REPORT_PERIODS else 'month'
             pdf_buffer, filename = generate_financial_report_pdf(period)
             if pdf_buffer:
                 return {"type": "document", "buffer": pdf_buffer, "filename": filename}
             return f"{conversational_response}\n\n{filename}"
             
-        elif intent in ["greeting", "compliment", "thanks", "general_chat"]:
+        elif intent in CHAT_INTENTS:
             return conversational_response
             
         elif intent == "help":
@@ -3251,7 +4968,7 @@ def process_command(user_input, user_name="User"):
     # The bot will continue checking legacy command prefixes.
     
     # Quick record for trained items: "birthday basic"
-    if not any(text_lower.startswith(prefix) for prefix in ['+', '/', 'balance', 'today', 'week', 'month', 'help', 'tutorial']):
+    if not text_lower.startswith(COMMAND_PREFIXES) and HAS_LETTER_RE.search(text_lower):
         # Check if this is a known item
         suggestion = auto_suggest_price(text_lower, user_name)
         if suggestion:
@@ -3267,577 +4984,17 @@ Suggested price: {format_cedi(suggestion['suggested'])}
 
 Confidence: {suggestion['confidence']}%"""
 
-    # ==================== LEARNING & HELP COMMANDS ====================
-    
-    # Tutorial
-    if text_lower in ['tutorial', 'guide', 'walkthrough', 'learn', 'howto']:
-        return get_tutorial_message()
-    
-    # Quick Start
-    elif text_lower in ['quickstart', 'quick', 'start', 'getting started']:
-        return get_quick_start_guide()
-    
-    # Examples
-    elif text_lower in ['examples', 'example', 'show me']:
-        return get_examples_message()
-    
-    # Help
-    elif text_lower in ['help', '/start', '/help', 'commands', 'menu', 'what can you do']:
-        return get_help_message()
-
-    # ==================== UNIT PRICE CALCULATION ====================
-    
-    if text_lower.startswith('unitprice ') or text_lower.startswith('perunit '):
-        parts = text.split()
-        if len(parts) >= 3:
-            try:
-                amount = float(parts[1])
-                description = ' '.join(parts[2:])
-                result = calculate_unit_price(amount, description)
-                if result:
-                    return result
-                else:
-                    return "❌ Couldn't detect quantity in description. Format: 'unitprice 500 10 chairs'"
-            except ValueError:
-                return "❌ Invalid amount format"
-        return "❌ Format: unitprice [total] [description with quantity]"
-    
-    # ==================== PRICE HISTORY & TRENDS ====================
-    
-    # Price history command
-    elif text_lower.startswith('price_history ') or text_lower.startswith('trends '):
-        parts = text.split()
-        if len(parts) >= 2:
-            item_name = ' '.join(parts[1:])
-            # Remove quotes if present
-            if item_name.startswith('"') and item_name.endswith('"'):
-                item_name = item_name[1:-1]
-            
-            trends = analyze_price_trends(item_name)
-            if not trends:
-                return f"❌ Not enough price history for '{item_name}'\n💡 Record more transactions with this item to see trends."
-            
-            emoji = "📈" if trends['trend'] == 'up' else "📉" if trends['trend'] == 'down' else "➖"
-            
-            response = f"{emoji} **PRICE TRENDS: {trends['item'].title()}**\n\n"
-            response += f"• **Data Points:** {trends['data_points']} transactions\n"
-            response += f"• **Average Price:** {format_cedi(trends['average_price'])}\n"
-            response += f"• **Range:** {format_cedi(trends['min_price'])} - {format_cedi(trends['max_price'])}\n"
-            response += f"• **Recent Trend:** {trends['trend_percent']:.1f}% ({trends['trend']})\n"
-            
-            if trends['trend_percent'] > 10:
-                response += f"⚠️ **Warning:** Prices increased significantly!\n"
-            elif trends['trend_percent'] < -10:
-                response += f"✅ **Good news:** Prices decreased!\n"
-            
-            # Get recent history
-            history = get_price_history(item_name, days=30)
-            if history:
-                response += f"\n📅 **Last {len(history)} purchases:**\n"
-                for h in history[-5:]:  # Show last 5
-                    unit_price = h['price'] / h['quantity'] if h['quantity'] > 1 else h['price']
-                    response += f"• {h['date']}: {format_cedi(unit_price)}"
-                    if h['quantity'] > 1:
-                        response += f" each ({h['quantity']} {h['unit']} for {format_cedi(h['price'])})"
-                    response += "\n"
-            
-            return response
-        return "❌ Format: price_history [item]\nExample: price_history \"printer paper\""
-    
-    # Compare prices command
-    elif text_lower.startswith('compare ') or text_lower.startswith('best_price '):
-        parts = text.split()
-        if len(parts) >= 2:
-            item_name = ' '.join(parts[1:])
-            history = get_price_history(item_name, days=365)
-            
-            if not history:
-                return f"❌ No price history for '{item_name}'"
-            
-            # Find best and worst deals
-            unit_prices = []
-            for h in history:
-                if h['quantity'] > 0:
-                    unit_prices.append({
-                        'date': h['date'],
-                        'unit_price': h['price'] / h['quantity'],
-                        'total': h['price'],
-                        'quantity': h['quantity']
-                    })
-            
-            if not unit_prices:
-                return f"❌ Couldn't calculate unit prices for '{item_name}'"
-            
-            best_deal = min(unit_prices, key=lambda x: x['unit_price'])
-            worst_deal = max(unit_prices, key=lambda x: x['unit_price'])
-            avg_price = sum(u['unit_price'] for u in unit_prices) / len(unit_prices)
-            
-            response = f"🏷️ **PRICE COMPARISON: {item_name.title()}**\n\n"
-            response += f"✅ **Best Deal:** {format_cedi(best_deal['unit_price'])} on {best_deal['date']}\n"
-            response += f"   ({best_deal['quantity']} for {format_cedi(best_deal['total'])})\n\n"
-            response += f"❌ **Worst Deal:** {format_cedi(worst_deal['unit_price'])} on {worst_deal['date']}\n"
-            response += f"   ({worst_deal['quantity']} for {format_cedi(worst_deal['total'])})\n\n"
-            response += f"📊 **Average:** {format_cedi(avg_price)}\n"
-            response += f"📈 **Price Range:** {format_cedi(best_deal['unit_price'])} - {format_cedi(worst_deal['unit_price'])}\n"
-            response += f"📋 **Total Purchases:** {len(history)}\n"
-            
-            # Advice
-            if best_deal['unit_price'] < avg_price * 0.8:
-                response += f"\n💡 **Tip:** Try to buy when price is around {format_cedi(best_deal['unit_price'])} like on {best_deal['date']}"
-            
-            return response
-        return "❌ Format: compare [item]\nExample: compare \"coffee\""
-    
-    # ==================== BUDGET MANAGEMENT ====================
-    
-    # Set budget
-    elif text_lower.startswith('+budget ') or text_lower.startswith('set_budget '):
-        parts = text.split()
-        if len(parts) >= 4:
-            category_item = parts[1]
-            try:
-                budget_amount = float(parts[2])
-                period = parts[3].lower()
-                alert_at = int(parts[4]) if len(parts) > 4 else 80
-                
-                if period not in ['daily', 'weekly', 'monthly']:
-                    return "❌ Period must be: daily, weekly, monthly"
-                
-                if not (0 < alert_at <= 100):
-                    return "❌ Alert percentage must be between 1-100"
-                
-                return set_budget(category_item, budget_amount, period, user_name, alert_at)
-                
-            except ValueError:
-                return "❌ Invalid amount format. Example: +budget #marketing 1000 monthly 80"
-        return "❌ Format: +budget [category/item] [amount] [daily/weekly/monthly] [alert_percentage]\nExample: +budget #marketing 1000 monthly 80"
-    
-    # Show budgets
-    elif text_lower in ['budgets', 'my_budgets', 'show_budgets']:
-        alerts = check_budget_alerts(user_name)
-        
-        try:
-            worksheet = spreadsheet.worksheet('Budgets')
-            all_rows = worksheet.get_all_values()
-            
-            if len(all_rows) <= 1:
-                return "📭 No budgets set. Use +budget to create one."
-            
-            response = "💰 **YOUR BUDGETS:**\n\n"
-            
-            for row in all_rows[1:]:
-                if row and len(row) > 8 and row[8].strip() == user_name:
-                    try:
-                        category_item = row[0]
-                        budget_amount = float(row[2]) if len(row) > 2 and row[2] else 0
-                        period = row[3] if len(row) > 3 else ""
-                        current_spent = float(row[4]) if len(row) > 4 and row[4] else 0
-                        remaining = float(row[5]) if len(row) > 5 else budget_amount
-                        status = row[10] if len(row) > 10 else "active"
-                        
-                        if status.lower() != 'active':
-                            continue
-                        
-                        percent_spent = (current_spent / budget_amount * 100) if budget_amount > 0 else 0
-                        
-                        # Choose emoji based on percentage
-                        if percent_spent >= 100:
-                            emoji = "❌"
-                        elif percent_spent >= 90:
-                            emoji = "⚠️"
-                        elif percent_spent >= 50:
-                            emoji = "📊"
-                        else:
-                            emoji = "✅"
-                        
-                        response += f"{emoji} **{category_item}**: {format_cedi(current_spent)} / {format_cedi(budget_amount)} {period}\n"
-                        response += f"   Remaining: {format_cedi(remaining)} | {percent_spent:.1f}% spent\n\n"
-                        
-                    except (ValueError, IndexError):
-                        continue
-            
-            if alerts:
-                response += "🚨 **BUDGET ALERTS:**\n"
-                for alert in alerts:
-                    response += f"⚠️ **{alert['category_item']}**: {alert['percent_spent']:.1f}% spent!\n"
-                    response += f"   {format_cedi(alert['spent'])} of {format_cedi(alert['budget'])} (Remaining: {format_cedi(alert['remaining'])})\n\n"
-            
-            return response
-            
-        except Exception:
-            return "❌ Cannot access budgets."
-    
-    # Delete budget
-    elif text_lower.startswith('+delete_budget '):
-        parts = text.split()
-        if len(parts) >= 2:
-            category_item = parts[1]
-            
-            try:
-                worksheet = spreadsheet.worksheet('Budgets')
-                all_rows = worksheet.get_all_values()
-                
-                for i, row in enumerate(all_rows[1:], start=2):
-                    if row and len(row) > 0 and row[0].strip().lower() == category_item.lower() and row[8].strip() == user_name:
-                        worksheet.update_cell(i, 11, 'deleted')  # Update status
-                        return f"✅ Deleted budget for {category_item}"
-                
-                return f"❌ No budget found for {category_item}"
-                
-            except Exception:
-                return "❌ Cannot access budgets."
-        return "❌ Format: +delete_budget [category/item]"
-    
-    # Budget summary
-    elif text_lower == 'budget_summary':
-        try:
-            worksheet = spreadsheet.worksheet('Budgets')
-            all_rows = worksheet.get_all_values()
-            
-            active_budgets = []
-            total_budget = 0
-            total_spent = 0
-            
-            for row in all_rows[1:]:
-                if row and len(row) > 10 and row[8].strip() == user_name and row[10].strip().lower() == 'active':
-                    try:
-                        budget_amount = float(row[2]) if len(row) > 2 and row[2] else 0
-                        current_spent = float(row[4]) if len(row) > 4 and row[4] else 0
-                        
-                        total_budget += budget_amount
-                        total_spent += current_spent
-                        
-                        percent_spent = (current_spent / budget_amount * 100) if budget_amount > 0 else 0
-                        
-                        active_budgets.append({
-                            'item': row[0],
-                            'budget': budget_amount,
-                            'spent': current_spent,
-                            'percent': percent_spent
-                        })
-                        
-                    except (ValueError, IndexError):
-                        continue
-            
-            if not active_budgets:
-                return "📭 No active budgets. Use +budget to create one."
-            
-            response = "📊 **BUDGET SUMMARY**\n\n"
-            response += f"Total Budget: {format_cedi(total_budget)}\n"
-            response += f"Total Spent: {format_cedi(total_spent)}\n"
-            response += f"Remaining: {format_cedi(total_budget - total_spent)}\n"
-            response += f"Overall Progress: {(total_spent/total_budget*100) if total_budget > 0 else 0:.1f}%\n\n"
-            
-            response += "**By Category/Item:**\n"
-            for budget in sorted(active_budgets, key=lambda x: x['percent'], reverse=True)[:10]:  # Top 10
-                emoji = "❌" if budget['percent'] >= 100 else "⚠️" if budget['percent'] >= 80 else "✅"
-                response += f"{emoji} {budget['item']}: {budget['percent']:.1f}% ({format_cedi(budget['spent'])}/{format_cedi(budget['budget'])})\n"
-            
-            # Advice
-            if total_spent > total_budget * 0.8:
-                response += "\n⚠️ **Warning:** You've used 80%+ of total budget!"
-            elif total_spent < total_budget * 0.3:
-                response += "\n✅ **Good:** You're under 30% of total budget!"
-            
-            return response
-            
-        except Exception:
-            return "❌ Cannot access budgets."
-
-    # ==================== PRICE TRAINING COMMANDS ====================
-    
-    # Train Price - FIXED VERSION
-    elif text_lower.startswith('+train'):
-        # Use the fixed parser function
-        item_name, min_price, max_price, unit = parse_train_command(text)
-        
-        if item_name is None:
-            # Error message is in the min_price variable
-            return min_price  # This contains the error message
-        
-        # Validate the prices
-        try:
-            min_price = float(min_price)
-            max_price = float(max_price)
-        except (ValueError, TypeError):
-            return "❌ Invalid price format. Use numbers like: 40 45"
-        
-        if min_price >= max_price:
-            return "❌ Minimum price must be less than maximum price."
-        
-        if max_price > 10000000:  # 10 million cedis sanity check
-            return "❌ Price seems unrealistic. Please check the amount."
-        
-        return train_price(item_name, min_price, max_price, unit, user_name)
-
-    # Forget Price
-    elif text_lower.startswith('+forget'):
-        parts = text.split()
-        if len(parts) < 2:
-            return "❌ Format: +forget [item]\nExample: +forget \"printer paper\""
-        
-        item_name = ' '.join(parts[1:])
-        # Remove quotes if present
-        if item_name.startswith('"') and item_name.endswith('"'):
-            item_name = item_name[1:-1]
-        
-        return forget_price(item_name)
-
-    # Price Check
-    elif text_lower.startswith('price_check'):
-        parts = text.split()
-        if len(parts) < 2:
-            return "❌ Format: price_check [item]\nExample: price_check \"printer paper\""
-        
-        item_name = ' '.join(parts[1:])
-        # Remove quotes if present
-        if item_name.startswith('"') and item_name.endswith('"'):
-            item_name = item_name[1:-1]
-        
-        price_info = check_price(item_name, 0)  # Check without amount
-        
-        if not price_info:
-            return f"❌ No price training found for '{item_name}'\n💡 Train it first with: +train \"{item_name}\" [min] [max]"
-        
-        range_info = price_info['range']
-        
-        response = f"💰 **PRICE CHECK: {range_info['item']}**\n\n"
-        response += f"Expected Range: ₵{range_info['min']:,.2f} - ₵{range_info['max']:,.2f}"
-        if range_info['unit']:
-            response += f" {range_info['unit']}"
-        response += f"\nConfidence: {range_info['confidence']}%"
-        
-        return response
-
-    # Show Prices
-    elif text_lower in ['show_prices', 'list_prices', 'trained_items', 'prices']:
-        return list_trained_items()
-
-    # ==================== ORDER TRACKING COMMANDS ====================
-    
-    # +order command
-    elif text_lower.startswith('+order'):
-        parts = text.split()
-        if len(parts) < 3:
-            return "❌ Format: +order [amount] [description]\nExample: +order 40 birthday basic"
-        try:
-            amount = float(parts[1])
-            description = ' '.join(parts[2:])
-            return record_order(amount, description, user_name)
-        except ValueError:
-            return "❌ Amount must be a number."
-
-    # Status updates: done, ready, paid
-    elif text_lower.startswith('done '):
-        order_id = text[5:].strip().upper()
-        return update_order_status(order_id, status="Delivered", payment_status="Paid", user_name=user_name)
-
-    elif text_lower.startswith('ready '):
-        order_id = text[6:].strip().upper()
-        return update_order_status(order_id, status="Ready for Delivery", user_name=user_name)
-
-    elif text_lower.startswith('paid '):
-        order_id = text[5:].strip().upper()
-        return update_order_status(order_id, payment_status="Paid", user_name=user_name)
-
-    # Retrieval: orders, pending, search, remind
-    elif text_lower == 'orders':
-        return get_orders(limit=10)
-
-    elif text_lower == 'pending':
-        return get_orders(limit=20, pending_only=True)
-
-    elif text_lower.startswith('search '):
-        query = text[7:].strip()
-        return search_orders(query)
-
-    elif text_lower in ['remind', 'reminders', 'pending_orders']:
-        return get_order_reminders()
-
-    # Service Insights
-    elif text_lower in ['insights', 'top services', 'service insights', 'reports']:
-        return get_service_insights()
-
-    # Profit Goals
-    elif text_lower.startswith('+goal '):
-        parts = text.split()
-        if len(parts) >= 2:
-            try:
-                amount = float(parts[1])
-                target_type = parts[2].lower() if len(parts) > 2 else "profit"
-                return set_goal(amount, target_type, user_name)
-            except ValueError:
-                return "❌ Amount must be a number.\nExample: +goal 5000 profit"
-        return "❌ Format: +goal [amount] [type]"
-
-    elif text_lower in ['goals', 'goal', 'my goals']:
-        progress = get_goal_progress("profit", user_name)
-        return progress if progress else "🎯 No active goals for this month. Set one with `+goal [amount]`!"
-
-    # Client Intelligence
-    elif text_lower == 'clients':
-        return list_clients(top_loyal=True)
-
-    elif text_lower == 'list clients':
-        return list_clients(top_loyal=False, limit=20)
-
-    elif text_lower.startswith('client '):
-        name = text[7:].strip()
-        profile = get_client_profile(name)
-        return profile if profile else f"🔍 No history found for '{name}'."
-
-    # Recurring Transactions
-    elif text_lower.startswith('+recurring '):
-        # Format: +recurring [sale/expense] [amount] [freq] [desc]
-        parts = text.split()
-        if len(parts) >= 5:
-            try:
-                trans_type = parts[1].lower()
-                amount = float(parts[2])
-                freq = parts[3].lower()
-                desc = ' '.join(parts[4:])
-                return add_recurring_transaction(trans_type, amount, desc, freq, user_name)
-            except ValueError:
-                return "❌ Amount must be a number."
-        return "❌ Format: +recurring [sale/expense] [amount] [daily/weekly/monthly] [description]"
-
-    elif text_lower == 'record due':
-        return check_recurring_due(user_name, auto_record=True)
-
-    # Financial Exports & Invoicing
-    elif text_lower.startswith('/export'):
-        parts = text.split()
-        period = parts[1].lower() if len(parts) > 1 else 'month'
-        pdf_buffer, filename = generate_financial_report_pdf(period)
-        if pdf_buffer:
-            return {"type": "document", "buffer": pdf_buffer, "filename": filename}
-        return filename # error message
-
-    elif text_lower.startswith('/invoice'):
-        parts = text.split()
-        if len(parts) < 2:
-            return "❌ Use: `/invoice ORDER_ID`"
-        order_id = parts[1].upper()
-        pdf_buffer, filename = generate_invoice_pdf(order_id)
-        if pdf_buffer:
-            return {"type": "document", "buffer": pdf_buffer, "filename": filename}
-        return filename # error message
-
-    # ==================== ORIGINAL TRANSACTION COMMANDS ====================
-    
-    # Record Sale
-    elif text_lower.startswith('+sale'):
-        parts = text.split()
-        if len(parts) < 3:
-            return "❌ Format: +sale [amount] [description]\nExample: +sale 500 Website design\n💡 Add #hashtag to categorize: +sale 500 Website design #web"
-        try:
-            amount = float(parts[1])
-            description = ' '.join(parts[2:])
-            return record_transaction('sale', amount, description, user_name)
-        except ValueError:
-            return "❌ Amount must be a number.\n💡 Example: +sale 500 Website design"
-
-    # Record Expense
-    elif text_lower.startswith('+expense'):
-        parts = text.split()
-        if len(parts) < 3:
-            return "❌ Format: +expense [amount] [description]\nExample: +expense 100 Office supplies\n💡 Add #hashtag to categorize: +expense 100 Office supplies #office"
-        try:
-            amount = float(parts[1])
-            description = ' '.join(parts[2:])
-            return record_transaction('expense', amount, description, user_name)
-        except ValueError:
-            return "❌ Amount must be a number.\n💡 Example: +expense 100 Office supplies"
-
-    # Record Income
-    elif text_lower.startswith('+income'):
-        parts = text.split()
-        if len(parts) < 3:
-            return "❌ Format: +income [amount] [description]\nExample: +income 1000 Investment\n💡 Add #hashtag to categorize: +income 1000 Investment #investment"
-        try:
-            amount = float(parts[1])
-            description = ' '.join(parts[2:])
-            return record_transaction('income', amount, description, user_name)
-        except ValueError:
-            return "❌ Amount must be a number.\n💡 Example: +income 1000 Investment"
-
-    # Check Balance
-    elif text_lower in ['balance', 'profit', 'net']:
-        return get_balance()
-
-    # Today's Summary
-    elif text_lower in ['today', 'today?', 'today.']:
-        return get_today_summary()
-
-    # Week Summary
-    elif text_lower in ['week', 'weekly', 'this week']:
-        return get_period_summary('week')
-
-    # Month Summary
-    elif text_lower in ['month', 'monthly', 'this month']:
-        return get_period_summary('month')
-
-    # Categories Report
-    elif text_lower in ['categories', 'category', '/categories']:
-        return get_categories_report()
-
-    # List Transactions
-    elif text_lower in ['list', 'transactions', '/list']:
-        try:
-            parts = text_lower.split()
-            limit = int(parts[1]) if len(parts) > 1 else 10
-            return list_user_transactions(user_name, limit=min(limit, 20))
-        except:
-            return list_user_transactions(user_name, limit=10)
-
-    # Smart Deletion
-    elif text_lower.startswith('delete') or text_lower.startswith('/delete'):
-        delete_part = text_lower.replace('delete', '', 1).replace('/', '', 1).strip()
-        
-        if not delete_part:
-            return list_user_transactions(user_name, limit=5)
-        
-        elif delete_part == 'last':
-            return delete_last_transaction(user_name)
-        
-        elif delete_part.startswith('id:'):
-            transaction_id = delete_part[3:].strip().upper()
-            return delete_transaction_by_id(transaction_id, user_name)
-        
-        elif delete_part == 'list':
-            return list_user_transactions(user_name, limit=10)
-        
-        else:
-            return """🗑️ **DELETION HELP**
-
-**HOW TO DELETE:**
-1. First, find the transaction ID:
-   • Type `list` to see your recent transactions
-   • Each transaction shows an ID like `EXP-ABC123`
-
-2. Then delete it:
-   • `/delete ID:EXP-ABC123` - Delete specific transaction
-   • `/delete last` - Delete most recent
-   • `/delete` - Show options
-
-**EXAMPLE:**
-You record: `+expense 500 Test`
-It shows: "Recorded... ID: EXP-ABC123"
-You delete: `/delete ID:EXP-ABC123`"""
-
-    # ==================== GREETINGS & MISCELLANEOUS ====================
-    
-    # Greetings
-    elif text_lower in ['hi', 'hello', 'hey', 'hola', 'greetings']:
-        return f"Hello {user_name}! 👋 Ready to manage your finances?\n💡 Try `tutorial` for a step-by-step guide, or `quickstart` to jump right in!"
+    # ==================== LEGACY COMMANDS ====================
+    handler = find_command_handler(text_lower)
+    if handler:
+        return handler(text, text_lower, text.split(), user_name)
     
     # Thanks
-    elif 'thank' in text_lower or 'thanks' in text_lower:
+    if 'thank' in text_lower or 'thanks' in text_lower:
         return "You're welcome! 😊 Let me know if you need anything else.\n💡 Need help? Try `tutorial` or `examples` for guidance."
     
     # Unknown command - HELPFUL RESPONSE
-    else:
-        return f"""🤔 I didn't understand that.
+    return f"""🤔 I didn't understand that.
 
 **QUICK OPTIONS:**
 • Record transaction: `+expense 100 Lunch` or `+sale 500 Project`